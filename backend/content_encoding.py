@@ -0,0 +1,273 @@
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+from responses import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # optional, "br" is only offered when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional, "zstd" is only offered when installed
+    zstandard = None
+
+DEFAULT_CONTENT_TYPES = ("application/json", "application/x-ndjson", "text/plain", "text/csv")
+# Status codes whose bodies must never be re-encoded (206 ranges refer to raw bytes)
+_PASSTHROUGH_STATUS = {204, 206, 304}
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+
+# Reasonable speed/ratio points for dynamic responses, see benchmarks/compression_bench.py
+DEFAULT_LEVELS = {"gzip": 5, "br": 4, "zstd": 3}
+
+
+def available_encodings(preference: Iterable[str]) -> List[str]:
+    """The configured encodings, in preference order, that can actually be produced"""
+    return [name for name in preference if name in ENCODERS]
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: Optional[str], encodings: List[str]) -> Optional[str]:
+    """Pick the first server-preferred encoding the client accepts with q > 0"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    for name in encodings:
+        if accepted.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+class CompressionStats:
+    """Counters shared with CompressionMiddleware, which Starlette builds lazily"""
+
+    def __init__(self):
+        self.compressed = 0
+        self.streamed = 0
+        self.skipped_small = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def stats(self) -> dict:
+        return {
+            "compressed": self.compressed,
+            "streamed": self.streamed,
+            "skipped_small": self.skipped_small,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": (self.bytes_out / self.bytes_in) if self.bytes_in else 0.0,
+        }
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing response bodies per Accept-Encoding.
+
+    Only responses whose Content-Type is in ``content_types`` are touched.
+    Complete bodies smaller than ``min_size`` bytes are sent as-is, since
+    framing overhead and CPU outweigh the saving. Streaming responses
+    (more_body=True) are compressed incrementally and flushed after every
+    chunk, so NDJSON and event streams still reach the client line by line.
+    Strong ETags on compressed responses get a per-coding suffix (see
+    responses.encoded_etag); Vary: Accept-Encoding keeps caches correct.
+    """
+
+    def __init__(
+        self,
+        app,
+        encodings: Iterable[str] = ("br", "zstd", "gzip"),
+        min_size: int = 1024,
+        content_types: Iterable[str] = DEFAULT_CONTENT_TYPES,
+        levels: Optional[Dict[str, int]] = None,
+        stats: Optional[CompressionStats] = None,
+    ):
+        self.app = app
+        self.encodings = available_encodings(encodings)
+        self.min_size = min_size
+        self.content_types = {t.lower() for t in content_types}
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.stats = stats or CompressionStats()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        accept = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept, self.encodings)
+        if encoding is None or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = None
+        for key, value in scope["headers"]:
+            if key == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+                break
+        state = {"start": None, "encoder": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            start = state["start"]
+            if start is not None:
+                # First body message decides whether this response is compressed
+                state["start"] = None
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                eligible = self._eligible(start)
+                if eligible and not more_body and len(body) < self.min_size:
+                    self.stats.skipped_small += 1
+                    eligible = False
+                if not eligible:
+                    state["passthrough"] = True
+                    if start["status"] == 304 and if_none_match:
+                        start = self._not_modified(start, encoding, if_none_match)
+                    await send(start)
+                    await send(message)
+                    return
+
+                encoder = state["encoder"] = ENCODERS[encoding](self.levels[encoding])
+                headers = [
+                    (k, v) for k, v in start["headers"]
+                    if k not in (b"content-length", b"vary", b"etag")
+                ]
+                for k, v in start["headers"]:
+                    if k == b"etag":
+                        etag = encoded_etag(v.decode("latin-1"), encoding)
+                        headers.append((b"etag", etag.encode("latin-1")))
+                vary = [v for k, v in start["headers"] if k == b"vary"]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+
+                self.stats.bytes_in += len(body)
+                if not more_body:
+                    data = encoder.compress(body) + encoder.finish()
+                    headers.append((b"content-length", str(len(data)).encode("latin-1")))
+                    self.stats.compressed += 1
+                    self.stats.bytes_out += len(data)
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+
+                self.stats.streamed += 1
+                data = encoder.compress(body) + encoder.flush()
+                self.stats.bytes_out += len(data)
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": data, "more_body": True})
+                return
+
+            if state["passthrough"]:
+                await send(message)
+                return
+
+            encoder = state["encoder"]
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            self.stats.bytes_in += len(body)
+            data = encoder.compress(body) + (encoder.flush() if more_body else encoder.finish())
+            self.stats.bytes_out += len(data)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _not_modified(self, start: dict, encoding: str, if_none_match: str) -> dict:
+        """Echo the coded ETag on a 304 when that is what the client revalidated"""
+        headers = []
+        for k, v in start["headers"]:
+            if k == b"etag":
+                etag = encoded_etag(v.decode("latin-1"), encoding)
+                if etag in if_none_match:
+                    v = etag.encode("latin-1")
+            headers.append((k, v))
+        return {**start, "headers": headers}
+
+    def _eligible(self, start: dict) -> bool:
+        if start["status"] in _PASSTHROUGH_STATUS:
+            return False
+        content_type = b""
+        for key, value in start["headers"]:
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value
+        media_type = content_type.split(b";", 1)[0].strip().decode("latin-1").lower()
+        return media_type in self.content_types
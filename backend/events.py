@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from pymongo.errors import OperationFailure, PyMongoError
+
+from responses import dumps
+
+logger = logging.getLogger(__name__)
+
+# Change stream error code when the resume token is older than the oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+class SubscriberLimit(Exception):
+    def __init__(self, message: str, per_user: bool = False):
+        super().__init__(message)
+        self.per_user = per_user
+
+    @property
+    def status_code(self) -> int:
+        """429 when the user has too many streams, 503 when the worker is full"""
+        return 429 if self.per_user else 503
+
+
+class Event:
+    __slots__ = ("seq", "id", "sub", "type", "data")
+
+    def __init__(self, seq: int, event_id: str, sub: Optional[str], event_type: str, data: dict):
+        self.seq = seq
+        self.id = event_id
+        self.sub = sub
+        self.type = event_type
+        self.data = data
+
+    def encode(self) -> str:
+        """SSE wire format"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {dumps(self.data).decode()}\n\n"
+
+
+class Subscription:
+    def __init__(self, sub: str, queue_size: int):
+        self.sub = sub
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=queue_size)
+
+
+class EventHub:
+    """
+    Per-user fan-out of change notifications to SSE subscribers in this worker.
+
+    Events get ids "<boot>-<seq>" and the last ``replay_size`` are kept, so a
+    client reconnecting with Last-Event-ID receives what it missed. When the
+    id is unknown (another worker, a restart, or too old) or a subscriber
+    falls ``queue_size`` events behind, it gets a "reset" event and should
+    refetch its state instead.
+
+    Events come either from a ChangeStreamFeed (all workers' writes) or, when
+    no feed is running, from notify() calls in the write paths of this worker.
+    """
+
+    def __init__(self, max_subscribers: int = 1000, max_per_user: int = 5, queue_size: int = 100, replay_size: int = 1000):
+        self.max_subscribers = max_subscribers
+        self.max_per_user = max_per_user
+        self.queue_size = queue_size
+        self.boot = os.urandom(4).hex()
+        self.source = "local"
+
+        self._seq = 0
+        self._recent: Deque[Event] = deque(maxlen=replay_size)
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.rejected = 0
+
+    def _reset_event(self, reason: str) -> Event:
+        return Event(self._seq, f"{self.boot}-{self._seq}", None, "reset", {"reason": reason})
+
+    def check_capacity(self, sub: str) -> None:
+        """Raise SubscriberLimit if ``sub`` could not subscribe right now"""
+        if self._count >= self.max_subscribers:
+            self.rejected += 1
+            raise SubscriberLimit("Too many event subscribers on this worker")
+        if len(self._subscribers.get(sub, ())) >= self.max_per_user:
+            self.rejected += 1
+            raise SubscriberLimit("Too many event streams for this user", per_user=True)
+
+    def subscribe(self, sub: str, last_event_id: Optional[str] = None) -> Subscription:
+        self.check_capacity(sub)
+        subscription = Subscription(sub, self.queue_size)
+        self._subscribers.setdefault(sub, set()).add(subscription)
+        self._count += 1
+        if last_event_id:
+            self._replay(subscription, last_event_id)
+        return subscription
+
+    def _replay(self, subscription: Subscription, last_event_id: str) -> None:
+        boot, _, seq = last_event_id.partition("-")
+        try:
+            seq = int(seq)
+        except ValueError:
+            seq = -1
+        oldest = self._recent[0].seq if self._recent else self._seq + 1
+        if boot != self.boot or seq < oldest - 1 or seq > self._seq:
+            subscription.queue.put_nowait(self._reset_event("resume_unavailable"))
+            return
+        missed = [e for e in self._recent if e.seq > seq and e.sub == subscription.sub]
+        if len(missed) > self.queue_size:
+            # Replaying only the newest would hide the gap from the client
+            subscription.queue.put_nowait(self._reset_event("resume_unavailable"))
+            return
+        for event in missed:
+            subscription.queue.put_nowait(event)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.sub)
+        if subscribers and subscription in subscribers:
+            subscribers.discard(subscription)
+            self._count -= 1
+            if not subscribers:
+                del self._subscribers[subscription.sub]
+
+    def _deliver(self, subscription: Subscription, event: Event) -> None:
+        try:
+            subscription.queue.put_nowait(event)
+            self.delivered += 1
+        except asyncio.QueueFull:
+            # Slow consumer: drop its backlog and tell it to resync
+            self.overflows += 1
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(self._reset_event("overflow"))
+
+    def dispatch(self, sub: str, event_type: str, data: dict) -> Event:
+        """Record an event and push it to the user's subscribers"""
+        self._seq += 1
+        event = Event(self._seq, f"{self.boot}-{self._seq}", sub, event_type, data)
+        self._recent.append(event)
+        self.published += 1
+        for subscription in list(self._subscribers.get(sub, ())):
+            self._deliver(subscription, event)
+        return event
+
+    def notify(self, sub: str, event_type: str, data: dict) -> None:
+        """Publish from a local write path; skipped when a change stream feeds the hub"""
+        if self.source == "local":
+            self.dispatch(sub, event_type, data)
+
+    def reset_all(self, reason: str) -> None:
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                self._deliver(subscription, self._reset_event(reason))
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "subscribers": self._count,
+            "users": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "rejected": self.rejected,
+        }
+
+
+async def stream(subscription: Subscription, heartbeat: float, retry_ms: int = 3000):
+    """Async generator of SSE frames for one subscriber, with comment heartbeats"""
+    yield f"retry: {retry_ms}\n\n"
+    while True:
+        try:
+            event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+        except asyncio.TimeoutError:
+            yield ": ping\n\n"
+            continue
+        yield event.encode()
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    SSE response that owns its subscription. The subscriber slot is taken
+    only once the response is running and released however it ends, so a
+    response that is never sent (client gone, an error before it is
+    returned) cannot leak one. Routes call hub.check_capacity() first to
+    answer 429/503 up front; if the slots filled up in between, that status
+    is sent from here instead.
+    """
+
+    def __init__(
+        self,
+        hub: EventHub,
+        sub: str,
+        heartbeat: float,
+        last_event_id: Optional[str] = None,
+        headers: Optional[dict] = None,
+    ):
+        super().__init__((), media_type="text/event-stream", headers=headers)
+        self.hub = hub
+        self.sub = sub
+        self.heartbeat = heartbeat
+        self.last_event_id = last_event_id
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            subscription = self.hub.subscribe(self.sub, self.last_event_id)
+        except SubscriberLimit as e:
+            response = JSONResponse({"detail": str(e)}, status_code=e.status_code, headers={"Retry-After": "5"})
+            await response(scope, receive, send)
+            return
+        try:
+            self.body_iterator = stream(subscription, self.heartbeat)
+            await super().__call__(scope, receive, send)
+        finally:
+            self.hub.unsubscribe(subscription)
+
+
+# Only the fields needed to route and describe a change leave the server
+_CHANGE_PIPELINE = [
+    {"$match": {
+        "operationType": {"$in": ["insert", "update", "replace"]},
+        "ns.coll": {"$in": ["user_profiles", "vr_sessions"]},
+    }},
+    {"$project": {
+        "operationType": 1,
+        "ns": 1,
+        "fullDocument.supabase_uid": 1,
+        "fullDocument.user_id": 1,
+        "fullDocument.id": 1,
+        "fullDocument.updated_at": 1,
+    }},
+]
+
+
+def change_to_event(change: dict) -> Optional[tuple]:
+    """Map a change stream document to (sub, event_type, data)"""
+    doc = change.get("fullDocument") or {}
+    collection = change.get("ns", {}).get("coll")
+    if collection == "user_profiles" and doc.get("supabase_uid"):
+        return doc["supabase_uid"], "profile.updated", {"updated_at": doc.get("updated_at")}
+    if collection == "vr_sessions" and doc.get("user_id"):
+        event_type = "session.created" if change.get("operationType") == "insert" else "session.updated"
+        return doc["user_id"], event_type, {"session_id": doc.get("id")}
+    return None
+
+
+class ChangeStreamFeed:
+    """
+    Feeds an EventHub from one database-level change stream per worker.
+
+    The stream's resume token is kept so transient errors resume without
+    losing changes; if the token has aged out of the oplog, every subscriber
+    is sent a reset. Change streams need a replica set: in "auto" mode a
+    standalone server makes start() return False and the hub stays local.
+    """
+
+    def __init__(self, hub: EventHub, db, retry_delay: float = 1.0):
+        self.hub = hub
+        self.db = db
+        self.retry_delay = retry_delay
+        self.resume_token: Optional[Any] = None
+        self._stream = None
+        self._task: Optional[asyncio.Task] = None
+        self.changes = 0
+        self.restarts = 0
+
+    def _open(self):
+        return self.db.watch(_CHANGE_PIPELINE, full_document="updateLookup", resume_after=self.resume_token)
+
+    def _handle(self, change: dict) -> None:
+        self.resume_token = change["_id"]
+        self.changes += 1
+        mapped = change_to_event(change)
+        if mapped is not None:
+            self.hub.dispatch(*mapped)
+
+    async def start(self) -> bool:
+        """Open the change stream; False if this deployment cannot provide one"""
+        try:
+            self._stream = self._open()
+            change = await self._stream.try_next()
+        except Exception as e:
+            logger.info("Change streams unavailable, using in-process events: %s", e)
+            self._stream = None
+            return False
+        if change is not None:
+            self._handle(change)
+        self.hub.source = "changestream"
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self._stream is None:
+                    self._stream = self._open()
+                async for change in self._stream:
+                    self._handle(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    self.resume_token = None
+                    self.hub.reset_all("history_lost")
+                logger.error("Change stream failed, reopening: %s", e)
+            except PyMongoError as e:
+                logger.error("Change stream interrupted, resuming: %s", e)
+            await self._close_stream()
+            self.restarts += 1
+            await asyncio.sleep(self.retry_delay)
+
+    async def _close_stream(self) -> None:
+        if self._stream is not None:
+            try:
+                await self._stream.close()
+            except PyMongoError:
+                pass
+            self._stream = None
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_stream()
+
+    def stats(self) -> dict:
+        return {"running": self._task is not None, "changes": self.changes, "restarts": self.restarts}
@@ -0,0 +1,264 @@
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from responses import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for format=parquet
+    pa = pq = None
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+class Dataset(NamedTuple):
+    collection: str
+    # column -> "string" | "timestamp" | "list" (of strings) | "json" (nested, encoded as text)
+    columns: Dict[str, str]
+    time_field: str
+    # Fields that may be filtered on by exact match
+    filters: Tuple[str, ...] = ()
+
+
+DATASETS = {
+    "profiles": Dataset(
+        "user_profiles",
+        {
+            "supabase_uid": "string",
+            "email": "string",
+            "full_name": "string",
+            "therapy_preferences": "list",
+            "vr_settings": "json",
+            "created_at": "timestamp",
+            "updated_at": "timestamp",
+        },
+        time_field="updated_at",
+    ),
+    "status_checks": Dataset(
+        "status_checks",
+        {"id": "string", "client_name": "string", "timestamp": "timestamp"},
+        time_field="timestamp",
+        filters=("client_name",),
+    ),
+}
+
+
+class ExportQuery(NamedTuple):
+    filter: dict
+    projection: dict
+    columns: List[str]
+
+
+def build_query(
+    dataset: Dataset,
+    fields: Optional[List[str]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[str] = None,
+    match: Optional[Dict[str, str]] = None,
+) -> ExportQuery:
+    """
+    Translate export options into a Mongo filter and projection.
+
+    Rows are always read in ``_id`` order and carry their ``_id``, so an
+    interrupted export resumes with ``after`` set to the last ``_id`` received.
+    """
+    columns = list(fields) if fields else list(dataset.columns)
+    unknown = set(columns) - set(dataset.columns)
+    if unknown:
+        raise ExportError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    query = {}
+    if since or until:
+        window = {}
+        if since:
+            window["$gte"] = since
+        if until:
+            window["$lt"] = until
+        query[dataset.time_field] = window
+    for field, value in (match or {}).items():
+        if field not in dataset.filters:
+            raise ExportError(f"Cannot filter on {field}")
+        if value is not None:
+            query[field] = value
+    if after:
+        try:
+            query["_id"] = {"$gt": ObjectId(after)}
+        except (InvalidId, TypeError):
+            raise ExportError("Invalid resume cursor")
+
+    projection = {"_id": 1, **{column: 1 for column in columns}}
+    return ExportQuery(query, projection, ["_id"] + columns)
+
+
+def _cell(value, kind: str):
+    if value is None:
+        return None
+    if kind == "json":
+        return dumps(value).decode()
+    return value
+
+
+class NDJSONEncoder:
+    def begin(self) -> bytes:
+        return b""
+
+    def batch(self, rows: List[dict]) -> bytes:
+        return b"".join(dumps(row) + b"\n" for row in rows)
+
+    def end(self) -> bytes:
+        return b""
+
+
+class CSVEncoder:
+    def __init__(self, columns: List[str], kinds: Dict[str, str], header: bool = True):
+        self.columns = columns
+        self.kinds = kinds
+        self.header = header
+
+    def begin(self) -> bytes:
+        if not self.header:
+            return b""
+        out = io.StringIO()
+        csv.writer(out).writerow(self.columns)
+        return out.getvalue().encode("utf-8")
+
+    def batch(self, rows: List[dict]) -> bytes:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        for row in rows:
+            cells = []
+            for column in self.columns:
+                value = row.get(column)
+                kind = self.kinds.get(column)
+                if value is None:
+                    cells.append("")
+                elif kind in ("json", "list"):
+                    cells.append(dumps(value).decode())
+                elif isinstance(value, datetime):
+                    cells.append(value.isoformat())
+                else:
+                    cells.append(value)
+            writer.writerow(cells)
+        return out.getvalue().encode("utf-8")
+
+    def end(self) -> bytes:
+        return b""
+
+
+class _Sink:
+    """Write target for ParquetWriter whose bytes are drained after each row group"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+_ARROW_TYPES = {
+    "string": lambda: pa.string(),
+    "json": lambda: pa.string(),
+    "list": lambda: pa.list_(pa.string()),
+    "timestamp": lambda: pa.timestamp("us"),
+}
+
+
+class ParquetEncoder:
+    """One row group per batch, flushed to the stream as soon as it is written"""
+
+    def __init__(self, columns: List[str], kinds: Dict[str, str]):
+        if pq is None:
+            raise ExportError("Parquet export requires pyarrow")
+        self.columns = columns
+        self.kinds = kinds
+        self.schema = pa.schema([(column, _ARROW_TYPES[kinds[column]]()) for column in columns])
+        self.sink = _Sink()
+        self.writer = pq.ParquetWriter(pa.PythonFile(self.sink, mode="w"), self.schema, compression="zstd")
+
+    def begin(self) -> bytes:
+        return self.sink.drain()
+
+    def batch(self, rows: List[dict]) -> bytes:
+        arrays = {
+            column: [_cell(row.get(column), self.kinds[column]) for row in rows]
+            for column in self.columns
+        }
+        self.writer.write_table(pa.Table.from_pydict(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def end(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+def make_encoder(fmt: str, columns: List[str], dataset: Dataset, header: bool = True):
+    kinds = {"_id": "string", **dataset.columns}
+    if fmt == "ndjson":
+        return NDJSONEncoder()
+    if fmt == "csv":
+        return CSVEncoder(columns, kinds, header=header)
+    if fmt == "parquet":
+        return ParquetEncoder(columns, kinds)
+    raise ExportError(f"Unsupported format: {fmt}")
+
+
+async def export_batches(
+    collection,
+    query: ExportQuery,
+    encoder,
+    batch_size: int = 5000,
+) -> AsyncIterator[Tuple[bytes, Optional[str], int]]:
+    """
+    Stream a collection through ``encoder`` one batch at a time.
+
+    Yields (encoded bytes, last _id in the batch, rows in the batch); the
+    first and final items may carry only framing (header / parquet footer).
+    At most ``batch_size`` documents are held in memory.
+    """
+    head = encoder.begin()
+    if head:
+        yield head, None, 0
+
+    cursor = collection.find(query.filter, query.projection).sort([("_id", 1)]).batch_size(batch_size)
+    rows = []
+    async for doc in cursor:
+        doc["_id"] = str(doc["_id"])
+        rows.append(doc)
+        if len(rows) >= batch_size:
+            yield encoder.batch(rows), rows[-1]["_id"], len(rows)
+            rows = []
+    if rows:
+        yield encoder.batch(rows), rows[-1]["_id"], len(rows)
+
+    tail = encoder.end()
+    if tail:
+        yield tail, None, 0
+
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Bulk export of CORE collections to NDJSON, CSV or Parquet
+
+    python export_cli.py status_checks status.parquet --format parquet --since 2024-01-01
+    python export_cli.py profiles profiles.ndjson --resume
+
+Progress is checkpointed to <output>.checkpoint after every batch, so an
+interrupted NDJSON/CSV export continues where it stopped with --resume.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from export import DATASETS, ExportError, build_query, export_batches, make_encoder
+
+ROOT_DIR = Path(__file__).parent
+
+app = typer.Typer(add_completion=False, help=__doc__)
+
+
+def checkpoint_path(output: Path) -> Path:
+    return output.with_name(output.name + ".checkpoint")
+
+
+def write_checkpoint(path: Path, state: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+async def run_export(dataset: str, output: Path, fmt: str, options: dict, batch_size: int, resume: bool) -> int:
+    load_dotenv(ROOT_DIR / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    spec = DATASETS[dataset]
+    checkpoint = checkpoint_path(output)
+
+    mode, after, offset, total = "wb", options.pop("after"), 0, 0
+    if resume:
+        if not checkpoint.exists():
+            raise ExportError(f"No checkpoint at {checkpoint}")
+        state = json.loads(checkpoint.read_text())
+        if state["dataset"] != dataset or state["format"] != fmt:
+            raise ExportError(f"Checkpoint is for a {state['format']} export of {state['dataset']}")
+        if fmt == "parquet":
+            raise ExportError(f"Parquet files cannot be appended to; export to a new file with --after {state['after']}")
+        # Resume with the original filters, dropping any partially written batch
+        options, after, offset, total = state["options"], state["after"], state["offset"], state["rows"]
+        mode = "r+b"
+
+    query = build_query(
+        spec,
+        fields=options["fields"],
+        since=datetime.fromisoformat(options["since"]) if options["since"] else None,
+        until=datetime.fromisoformat(options["until"]) if options["until"] else None,
+        after=after,
+        match={"client_name": options["client_name"]} if options["client_name"] else None,
+    )
+    encoder = make_encoder(fmt, query.columns, spec, header=not resume)
+
+    try:
+        with open(output, mode) as f:
+            f.seek(offset)
+            f.truncate()
+            async for data, last_id, rows in export_batches(db[spec.collection], query, encoder, batch_size):
+                f.write(data)
+                if last_id is None:
+                    continue
+                total += rows
+                f.flush()
+                write_checkpoint(checkpoint, {
+                    "dataset": dataset,
+                    "format": fmt,
+                    "options": options,
+                    "after": last_id,
+                    "offset": f.tell(),
+                    "rows": total,
+                })
+                typer.echo(f"{total} rows, cursor {last_id}", err=True)
+    finally:
+        client.close()
+
+    checkpoint.unlink(missing_ok=True)
+    return total
+
+
+@app.command()
+def main(
+    dataset: str = typer.Argument(..., help=f"one of: {', '.join(DATASETS)}"),
+    output: Path = typer.Argument(..., help="file to write"),
+    fmt: str = typer.Option("ndjson", "--format", help="ndjson, csv or parquet"),
+    fields: Optional[str] = typer.Option(None, help="comma-separated columns to export"),
+    since: Optional[datetime] = typer.Option(None, help="only rows at or after this time"),
+    until: Optional[datetime] = typer.Option(None, help="only rows before this time"),
+    client_name: Optional[str] = typer.Option(None, help="status_checks only: filter by client"),
+    after: Optional[str] = typer.Option(None, help="start after this _id (resume cursor)"),
+    batch_size: int = typer.Option(5000, min=1, help="documents per batch / parquet row group"),
+    resume: bool = typer.Option(False, "--resume", help="continue from <output>.checkpoint"),
+):
+    if dataset not in DATASETS:
+        raise typer.BadParameter(f"unknown dataset {dataset}", param_hint="dataset")
+    options = {
+        "fields": [f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat() if until else None,
+        "client_name": client_name,
+        "after": after,
+    }
+    try:
+        total = asyncio.run(run_export(dataset, output, fmt, options, batch_size, resume))
+    except ExportError as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(1)
+    typer.echo(f"Exported {total} rows to {output}")
+
+
+if __name__ == "__main__":
+    app()
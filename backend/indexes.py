@@ -0,0 +1,114 @@
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    name: str
+    unique: bool = False
+    # Set for TTL indexes: documents expire this many seconds after the indexed date
+    expire_after_seconds: Optional[int] = None
+
+    def model(self) -> IndexModel:
+        options = {}
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        return IndexModel(list(self.keys), name=self.name, unique=self.unique, **options)
+
+
+class IndexBootstrapError(RuntimeError):
+    pass
+
+
+# Indexes the API relies on. Add new collections here rather than creating
+# indexes ad hoc in route handlers.
+REQUIRED_INDEXES: List[IndexSpec] = [
+    IndexSpec("user_profiles", (("supabase_uid", ASCENDING),), "supabase_uid_unique", unique=True),
+    IndexSpec("status_checks", (("timestamp", ASCENDING), ("id", ASCENDING)), "timestamp_id"),
+    IndexSpec("vr_sessions", (("user_id", ASCENDING), ("date", DESCENDING), ("id", DESCENDING)), "user_date_desc"),
+    IndexSpec("vr_sessions", (("id", ASCENDING),), "id_unique", unique=True),
+    IndexSpec(
+        "status_rollups",
+        (("interval", ASCENDING), ("bucket", ASCENDING), ("client_name", ASCENDING)),
+        "interval_bucket_client_unique",
+        unique=True,
+    ),
+]
+
+
+def register_index(spec: IndexSpec) -> None:
+    """Declare an additional index to be verified at startup"""
+    if spec not in REQUIRED_INDEXES:
+        REQUIRED_INDEXES.append(spec)
+
+
+def _diff(spec: IndexSpec, existing: Dict[str, dict]) -> Tuple[str, str]:
+    """Compare a declared index against index_information() output"""
+    wanted_keys = list(spec.keys)
+    for name, info in existing.items():
+        if [tuple(k) for k in info.get("key", [])] != wanted_keys:
+            continue
+        if bool(info.get("unique", False)) != spec.unique:
+            return "drift", f"index {name} on {wanted_keys} has unique={info.get('unique', False)}, expected {spec.unique}"
+        if info.get("expireAfterSeconds") != spec.expire_after_seconds:
+            return "drift", f"index {name} on {wanted_keys} has expireAfterSeconds={info.get('expireAfterSeconds')}, expected {spec.expire_after_seconds}"
+        return "ok", name
+    if spec.name in existing:
+        return "drift", f"index name {spec.name} is used by keys {existing[spec.name].get('key')}"
+    return "missing", spec.name
+
+
+async def ensure_indexes(db, mode: str = "warn", specs: List[IndexSpec] = None) -> dict:
+    """
+    Create missing indexes and report drift.
+
+    ``mode`` is "off" (skip entirely), "warn" (log problems and carry on) or
+    "fail" (raise IndexBootstrapError so startup aborts).
+    """
+    report = {"created": [], "ok": [], "drift": [], "errors": []}
+    if mode == "off":
+        return report
+
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs if specs is not None else REQUIRED_INDEXES:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for collection_name, collection_specs in by_collection.items():
+        collection = db[collection_name]
+        try:
+            existing = await collection.index_information()
+        except PyMongoError as e:
+            report["errors"].append(f"{collection_name}: {e}")
+            continue
+
+        to_create = []
+        for spec in collection_specs:
+            state, detail = _diff(spec, existing)
+            if state == "ok":
+                report["ok"].append(f"{collection_name}.{detail}")
+            elif state == "drift":
+                report["drift"].append(f"{collection_name}: {detail}")
+            else:
+                to_create.append(spec)
+
+        if to_create:
+            try:
+                names = await collection.create_indexes([spec.model() for spec in to_create])
+                report["created"].extend(f"{collection_name}.{name}" for name in names)
+            except PyMongoError as e:
+                report["errors"].append(f"{collection_name}: {e}")
+
+    for name in report["created"]:
+        logger.info("Created index %s", name)
+    problems = report["drift"] + report["errors"]
+    for problem in problems:
+        logger.warning("Index bootstrap: %s", problem)
+    if problems and mode == "fail":
+        raise IndexBootstrapError("; ".join(problems))
+    return report
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from jose import jwk
+from jose.exceptions import JOSEError
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"}
+_EC_CURVE_ALGORITHMS = {"P-256": "ES256", "P-384": "ES384", "P-521": "ES512"}
+
+
+def _key_algorithm(key_data: dict) -> Optional[str]:
+    """The algorithm a JWK may be used with, from "alg" or inferred from kty/crv"""
+    if key_data.get("alg"):
+        return key_data["alg"]
+    if key_data.get("kty") == "RSA":
+        return "RS256"
+    if key_data.get("kty") == "EC":
+        return _EC_CURVE_ALGORITHMS.get(key_data.get("crv"))
+    return None
+
+
+class JWKSKeyStore:
+    """
+    Verification keys from a JWKS document, parsed once and cached by ``kid``.
+
+    ``source`` is a local file path or an http(s) URL. The document is
+    re-read every ``refresh_interval`` seconds by a background task so
+    rotated keys are picked up. A token naming an unknown ``kid`` triggers
+    at most one on-demand refresh per ``min_refresh_interval``. A kid that a
+    successful refresh did not find is remembered as unknown for
+    ``negative_ttl`` seconds; one seen while refreshes are rate limited (or
+    after a failed fetch) only until the next refresh is allowed. A flood of
+    bogus tokens never turns into a flood of key fetches.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        refresh_interval: float = 600.0,
+        min_refresh_interval: float = 30.0,
+        negative_ttl: float = 300.0,
+        fetch_timeout: float = 5.0,
+    ):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.negative_ttl = negative_ttl
+        self.fetch_timeout = fetch_timeout
+
+        self._keys: Dict[str, Tuple[str, object]] = {}
+        self._unknown: Dict[str, float] = {}
+        self._last_fetch = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.fetches = 0
+        self.fetch_failures = 0
+        self.negative_hits = 0
+
+    def _read_source(self) -> dict:
+        if self.source.startswith(("http://", "https://")):
+            with urllib.request.urlopen(self.source, timeout=self.fetch_timeout) as response:
+                return json.loads(response.read())
+        return json.loads(Path(self.source).read_text())
+
+    def load_document(self, document: dict) -> int:
+        """Parse every usable key in a JWKS document, replacing the current set"""
+        keys = {}
+        for key_data in document.get("keys", []):
+            kid = key_data.get("kid")
+            alg = _key_algorithm(key_data)
+            if not kid or alg not in ASYMMETRIC_ALGORITHMS or key_data.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[kid] = (alg, jwk.construct(key_data, algorithm=alg))
+            except JOSEError as e:
+                logger.warning("Skipping unusable JWKS key %s: %s", kid, e)
+        self._keys = keys
+        # Newly published kids must not stay negatively cached
+        for kid in keys:
+            self._unknown.pop(kid, None)
+        return len(keys)
+
+    async def refresh(self) -> None:
+        """Re-read the JWKS source; concurrent callers share one fetch"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh())
+        await asyncio.shield(self._refreshing)
+
+    async def _refresh(self) -> None:
+        self._last_fetch = time.monotonic()
+        self.fetches += 1
+        try:
+            document = await asyncio.to_thread(self._read_source)
+            count = self.load_document(document)
+            logger.info("Loaded %d JWKS keys from %s", count, self.source)
+        except Exception as e:
+            self.fetch_failures += 1
+            logger.error("JWKS refresh from %s failed: %s", self.source, e)
+
+    async def get_key(self, kid: Optional[str], alg: str) -> Optional[object]:
+        """Return the parsed key for ``kid`` if it exists and matches ``alg``"""
+        if not kid:
+            return None
+        entry = self._keys.get(kid)
+        if entry is None:
+            now = time.monotonic()
+            if self._unknown.get(kid, 0) > now:
+                self.negative_hits += 1
+                return None
+            refreshing = self._refreshing is not None and not self._refreshing.done()
+            if not refreshing and now - self._last_fetch < self.min_refresh_interval:
+                # Rate limited: remember the kid only until the next refresh
+                # is allowed, so a key published meanwhile is not locked out
+                self._remember_unknown(kid, self._last_fetch + self.min_refresh_interval)
+                return None
+            failures = self.fetch_failures
+            await self.refresh()
+            entry = self._keys.get(kid)
+            if entry is None:
+                # Only a successful fetch proves the kid is not published
+                if self.fetch_failures == failures:
+                    until = time.monotonic() + self.negative_ttl
+                else:
+                    until = self._last_fetch + self.min_refresh_interval
+                self._remember_unknown(kid, until)
+                return None
+        key_alg, key = entry
+        return key if key_alg == alg else None
+
+    def _remember_unknown(self, kid: str, until: float) -> None:
+        self._unknown[kid] = until
+        if len(self._unknown) > 10000:
+            now = time.monotonic()
+            self._unknown = {k: t for k, t in self._unknown.items() if t > now}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self) -> None:
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._keys),
+            "negative_cached": len(self._unknown),
+            "fetches": self.fetches,
+            "fetch_failures": self.fetch_failures,
+            "negative_hits": self.negative_hits,
+        }
@@ -0,0 +1,298 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, *label_values, value: float) -> None:
+        self._values[label_values] = value
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def collect(self) -> List[str]:
+        lines = super().collect()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._bounds = [f'le="{b}"' for b in self.buckets] + ['le="+Inf"']
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *label_values) -> "_Timer":
+        return _Timer(self, label_values)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self._bounds, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram: Histogram, label_values: tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]) -> None:
+        """Register a callable producing extra exposition lines at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "core_http_requests_total", "HTTP requests by route, method and status code", ("route", "method", "status")))
+http_request_duration_seconds = registry.register(Histogram(
+    "core_http_request_duration_seconds", "HTTP request latency by route", ("route", "method")))
+http_requests_in_flight = registry.register(Gauge(
+    "core_http_requests_in_flight", "HTTP requests currently being served"))
+http_errors_total = registry.register(Counter(
+    "core_http_errors_total", "HTTP responses with status >= 400 by status code", ("status",)))
+jwt_verify_duration_seconds = registry.register(Histogram(
+    "core_jwt_verify_duration_seconds", "Time spent in jwt.decode on token cache misses"))
+mongo_command_duration_seconds = registry.register(Histogram(
+    "core_mongo_command_duration_seconds", "Mongo command latency by collection and operation", ("collection", "command")))
+mongo_command_failures_total = registry.register(Counter(
+    "core_mongo_command_failures_total", "Failed Mongo commands by collection and operation", ("collection", "command")))
+
+
+def stats_collector(prefix: str, stats: Callable[[], dict]) -> Callable[[], List[str]]:
+    """Expose the numeric fields of a stats() dict as gauges"""
+    def collect() -> List[str]:
+        lines = []
+        for key, value in stats().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+        return lines
+    return collect
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route counts and latency.
+
+    Routes are labelled by their path template (e.g. /api/vr/sessions/{session_id})
+    so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            code = status_holder[0]
+            http_requests_total.inc(path, method, str(code))
+            http_request_duration_seconds.observe(elapsed, path, method)
+            if code >= 400:
+                http_errors_total.inc(str(code))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Feeds Mongo command latency into the metrics registry"""
+
+    def __init__(self):
+        self._pending: Dict[tuple, str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _collection(self, event) -> str:
+        return self._pending.pop((event.connection_id, event.request_id), "")
+
+    def succeeded(self, event):
+        mongo_command_duration_seconds.observe(
+            event.duration_micros / 1e6, self._collection(event), event.command_name)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        mongo_command_duration_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_command_failures_total.inc(collection, event.command_name)
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Tracks connection pool utilization for capacity planning"""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.created = 0
+        self.closed = 0
+        self.checkout_failures = 0
+        self.max_checked_out = 0
+        self.checkout_wait = Histogram(
+            "core_mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection")
+        self._lock = threading.Lock()
+        # Check-out events fire synchronously on the thread doing the
+        # check-out; pymongo 4.5 events carry no duration, so time it here
+        self._checkout = threading.local()
+
+    def _adjust(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._adjust(open=1, created=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._adjust(open=-1, closed=1)
+
+    def connection_check_out_started(self, event):
+        self._checkout.started = time.perf_counter()
+        self._adjust(waiting=1)
+
+    def _observe_wait(self) -> None:
+        started = getattr(self._checkout, "started", None)
+        if started is not None:
+            self._checkout.started = None
+            self.checkout_wait.observe(time.perf_counter() - started)
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait()
+        self._adjust(waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._observe_wait()
+        self._adjust(waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._adjust(checked_out=-1)
+
+    def stats(self) -> dict:
+        return {
+            "open": self.open,
+            "checked_out": self.checked_out,
+            "waiting": self.waiting,
+            "max_checked_out": self.max_checked_out,
+            "created": self.created,
+            "closed": self.closed,
+            "checkout_failures": self.checkout_failures,
+        }
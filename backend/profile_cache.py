@@ -0,0 +1,177 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+
+class ProfileCacheBackend(ABC):
+    """
+    Storage interface for serialized profiles.
+
+    The in-process MemoryBackend is the default; a shared store (e.g. Redis)
+    can be plugged in by implementing get/set/delete when running several
+    uvicorn workers. Such backends should also override get_many with one
+    batched round trip (e.g. MGET).
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    async def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """Values for the keys that are present; missing keys are omitted"""
+        values = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    def size(self) -> int:
+        return -1
+
+
+class MemoryBackend(ProfileCacheBackend):
+    """Size-bounded TTL/LRU store local to the current process"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class CachedProfile(NamedTuple):
+    etag: str
+    body: str
+
+
+class ProfileCache:
+    """
+    Read-through cache of serialized UserProfile JSON keyed by supabase_uid.
+
+    Each entry carries the response's ETag so conditional requests can be
+    answered without re-serializing. Backends store both as one string.
+
+    Read-through fills take a generation() before reading Mongo and store
+    with fill(), which is skipped if the profile was written (set or
+    invalidated) since; otherwise a slow read could overwrite a newer
+    profile with the one it loaded. Generations are tracked per process,
+    for the last ``max_tracked_writes`` written uids.
+    """
+
+    def __init__(
+        self,
+        backend: ProfileCacheBackend,
+        ttl: float = 60.0,
+        enabled: bool = True,
+        max_tracked_writes: int = 10000,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.max_tracked_writes = max_tracked_writes
+        self.hits = 0
+        self.misses = 0
+        self.stale_fills = 0
+
+        self._generation = 0
+        # Generations older than this are treated as stale for every uid
+        self._floor = 0
+        self._written: "OrderedDict[str, int]" = OrderedDict()
+
+    async def get(self, supabase_uid: str) -> Optional[CachedProfile]:
+        if not self.enabled:
+            return None
+        value = await self.backend.get(supabase_uid)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        etag, body = value.split("\n", 1)
+        return CachedProfile(etag, body)
+
+    async def get_many(self, supabase_uids: List[str]) -> Dict[str, CachedProfile]:
+        """Cached profiles for the given uids in one backend call; misses are omitted"""
+        if not self.enabled or not supabase_uids:
+            return {}
+        values = await self.backend.get_many(supabase_uids)
+        self.hits += len(values)
+        self.misses += len(supabase_uids) - len(values)
+        return {uid: CachedProfile(*value.split("\n", 1)) for uid, value in values.items()}
+
+    def generation(self) -> int:
+        """Take before reading a profile from Mongo for fill()"""
+        return self._generation
+
+    def _record_write(self, supabase_uid: str) -> None:
+        self._generation += 1
+        self._written[supabase_uid] = self._generation
+        self._written.move_to_end(supabase_uid)
+        while len(self._written) > self.max_tracked_writes:
+            _, self._floor = self._written.popitem(last=False)
+
+    async def fill(self, supabase_uid: str, generation: int, etag: str, body: str) -> bool:
+        """Cache a profile read at ``generation`` unless it was written since"""
+        if not self.enabled:
+            return False
+        if generation < self._floor or self._written.get(supabase_uid, 0) > generation:
+            self.stale_fills += 1
+            return False
+        await self.backend.set(supabase_uid, f"{etag}\n{body}", self.ttl)
+        return True
+
+    async def set(self, supabase_uid: str, etag: str, body: str) -> None:
+        """Store a profile just written to Mongo"""
+        if self.enabled:
+            self._record_write(supabase_uid)
+            await self.backend.set(supabase_uid, f"{etag}\n{body}", self.ttl)
+
+    async def invalidate(self, supabase_uid: str) -> None:
+        if self.enabled:
+            self._record_write(supabase_uid)
+            await self.backend.delete(supabase_uid)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "size": self.backend.size(),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_fills": self.stale_fills,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
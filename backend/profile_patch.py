@@ -0,0 +1,142 @@
+from typing import Any, Dict, List, Optional
+
+# Top-level profile fields clients may modify, with the value written when
+# a merge patch nulls them out
+EDITABLE_FIELDS = {
+    "full_name": None,
+    "therapy_preferences": [],
+    "vr_settings": {},
+}
+# Fields whose sub-keys may be addressed with dotted paths
+NESTED_FIELDS = {"vr_settings"}
+ARRAY_FIELDS = {"therapy_preferences"}
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _check_key(key: str) -> None:
+    if not isinstance(key, str) or not key or key.startswith("$") or "." in key or "\0" in key:
+        raise PatchError(f"Invalid key: {key!r}")
+
+
+def check_path(path: str) -> str:
+    """Validate a dotted path against the editable profile fields"""
+    if not isinstance(path, str):
+        raise PatchError(f"Invalid path: {path!r}")
+    parts = path.split(".")
+    for part in parts:
+        _check_key(part)
+    root = parts[0]
+    if root not in EDITABLE_FIELDS:
+        raise PatchError(f"Field is not editable: {root}")
+    if len(parts) > 1 and root not in NESTED_FIELDS:
+        raise PatchError(f"Field does not support nested paths: {root}")
+    return path
+
+
+def _check_value(path: str, value: Any) -> None:
+    if path == "full_name" and value is not None and not isinstance(value, str):
+        raise PatchError("full_name must be a string")
+    if path == "therapy_preferences" and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+        raise PatchError("therapy_preferences must be a list of strings")
+    if path == "vr_settings" and not isinstance(value, dict):
+        raise PatchError("vr_settings must be an object")
+
+
+def _check_conflicts(paths: List[str]) -> None:
+    """Mongo rejects updates touching a path twice or a path and its parent"""
+    seen = set()
+    for path in paths:
+        if path in seen:
+            raise PatchError(f"Path updated more than once: {path}")
+        seen.add(path)
+    for path in paths:
+        parts = path.split(".")
+        for i in range(1, len(parts)):
+            parent = ".".join(parts[:i])
+            if parent in seen:
+                raise PatchError(f"Conflicting paths: {parent} and {path}")
+
+
+def compile_merge_patch(patch: Dict[str, Any]) -> Dict[str, dict]:
+    """
+    Compile an RFC 7396 JSON merge patch into targeted Mongo operators.
+
+    Objects under vr_settings are merged key by key ($set / $unset on dotted
+    paths); every other value, including arrays, replaces the target.
+    """
+    if not isinstance(patch, dict):
+        raise PatchError("Merge patch must be a JSON object")
+
+    set_fields: Dict[str, Any] = {}
+    unset_fields: Dict[str, str] = {}
+
+    def walk(obj: dict, prefix: str) -> None:
+        for key, value in obj.items():
+            _check_key(key)
+            path = f"{prefix}{key}"
+            root = path.split(".", 1)[0]
+            if not prefix:
+                check_path(path)
+            if value is None:
+                if path in EDITABLE_FIELDS:
+                    set_fields[path] = EDITABLE_FIELDS[path]
+                else:
+                    unset_fields[path] = ""
+            elif isinstance(value, dict) and root in NESTED_FIELDS:
+                walk(value, f"{path}.")
+            else:
+                _check_value(path, value)
+                set_fields[path] = value
+
+    walk(patch, "")
+    return _operators(set_fields, unset_fields, {})
+
+
+def compile_operations(
+    set_paths: Optional[Dict[str, Any]] = None,
+    unset_paths: Optional[List[str]] = None,
+    add_to_set: Optional[Dict[str, List[Any]]] = None,
+) -> Dict[str, dict]:
+    """Compile explicit dotted-path operations into Mongo operators"""
+    set_fields = {}
+    for path, value in (set_paths or {}).items():
+        check_path(path)
+        _check_value(path, value)
+        set_fields[path] = value
+
+    unset_fields = {}
+    for path in unset_paths or []:
+        check_path(path)
+        if path in EDITABLE_FIELDS:
+            # Keep top-level fields present so stored profiles stay valid
+            set_fields[path] = EDITABLE_FIELDS[path]
+        else:
+            unset_fields[path] = ""
+
+    add_fields = {}
+    for path, values in (add_to_set or {}).items():
+        check_path(path)
+        if not isinstance(values, list):
+            raise PatchError(f"add_to_set values for {path} must be a list")
+        if path in ARRAY_FIELDS and not all(isinstance(v, str) for v in values):
+            raise PatchError(f"{path} only holds strings")
+        if path in EDITABLE_FIELDS and path not in ARRAY_FIELDS:
+            raise PatchError(f"Field is not an array: {path}")
+        add_fields[path] = {"$each": values}
+
+    return _operators(set_fields, unset_fields, add_fields)
+
+
+def _operators(set_fields: dict, unset_fields: dict, add_fields: dict) -> Dict[str, dict]:
+    _check_conflicts(list(set_fields) + list(unset_fields) + list(add_fields))
+    update = {}
+    if set_fields:
+        update["$set"] = set_fields
+    if unset_fields:
+        update["$unset"] = unset_fields
+    if add_fields:
+        update["$addToSet"] = add_fields
+    return update
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by caller (user ``sub`` or client IP).
+
+    Each bucket refills at ``rate`` tokens per second up to ``burst``; a
+    request spends one token. Idle buckets are dropped LRU-first once
+    ``max_keys`` callers are being tracked.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.allowed = 0
+        self.limited = 0
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def acquire(self, key: str) -> Tuple[bool, float]:
+        """Spend a token for ``key``; returns (allowed, seconds until next token)"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            tokens, last = bucket
+            bucket[0] = min(self.burst, tokens + (now - last) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self.allowed += 1
+            return True, 0.0
+        self.limited += 1
+        return False, (1 - bucket[0]) / self.rate if self.rate > 0 else 60.0
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tracked_keys": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+def parse_limit(value: str) -> Tuple[float, float]:
+    """Parse a "rate:burst" setting such as "10:30" """
+    rate, _, burst = value.partition(":")
+    rate = float(rate)
+    return rate, float(burst) if burst else rate
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller starts the work as a task; callers arriving while it is
+    in flight await the same task. A cancelled caller does not cancel the
+    shared work for the others.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.shared = 0
+        self._calls: Dict[Any, asyncio.Task] = {}
+
+    async def do(self, key: Any, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.executed += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "executed": self.executed, "shared": self.shared}
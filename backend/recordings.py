@@ -0,0 +1,219 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+
+from indexes import IndexSpec, register_index
+
+logger = logging.getLogger(__name__)
+
+BUCKET = "recordings"
+
+# GridFS spec indexes, plus the per-session lookup used by the routes
+register_index(IndexSpec(f"{BUCKET}.chunks", (("files_id", ASCENDING), ("n", ASCENDING)), "files_id_1_n_1", unique=True))
+register_index(IndexSpec(f"{BUCKET}.files", (("filename", ASCENDING), ("uploadDate", ASCENDING)), "filename_1_uploadDate_1"))
+register_index(IndexSpec(
+    f"{BUCKET}.files",
+    (("metadata.user_id", ASCENDING), ("metadata.session_id", ASCENDING), ("uploadDate", DESCENDING)),
+    "user_session_upload_desc",
+))
+
+
+class RecordingTooLarge(Exception):
+    pass
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], length: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" range into inclusive (start, end) offsets.
+
+    Returns None when the whole file should be sent (no header, a non-bytes
+    unit, several ranges, which servers may ignore, or an empty file). Raises
+    RangeNotSatisfiable when the range lies outside the file.
+    """
+    if not header or length == 0:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, length - suffix), length - 1
+        start = int(first)
+        end = int(last) if last else length - 1
+    except ValueError:
+        return None
+    if start >= length or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, length - 1)
+
+
+class RecordingStore:
+    """
+    VR session recordings stored in GridFS layout (``recordings.files`` /
+    ``recordings.chunks``), so standard GridFS tools can read them.
+
+    Uploads are consumed chunk by chunk and written ``batch_chunks`` chunks
+    per insert_many, keeping at most one batch in memory. Downloads read only
+    the chunks covering the requested byte range from one sorted cursor.
+
+    A new upload replaces the session's previous recording, but the old
+    file is only deleted ``replace_grace`` seconds after it was superseded,
+    so downloads already streaming it can finish. Deletions pending at
+    shutdown happen on the session's next upload.
+
+    Motor's GridFSBucket is not used because its upload stream inserts each
+    chunk with a separate insert_one, one round trip per chunk.
+    """
+
+    def __init__(self, db, chunk_size: int = 1024 * 1024, batch_chunks: int = 8, replace_grace: float = 300.0):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.batch_chunks = batch_chunks
+        self.replace_grace = replace_grace
+        self._purges: Set[asyncio.Task] = set()
+
+    @property
+    def files(self):
+        return self.db[f"{BUCKET}.files"]
+
+    @property
+    def chunks(self):
+        return self.db[f"{BUCKET}.chunks"]
+
+    async def upload(
+        self,
+        body: AsyncIterator[bytes],
+        user_id: str,
+        session_id: str,
+        content_type: str,
+        max_bytes: int,
+    ) -> dict:
+        """Store a streamed recording and replace the session's previous one"""
+        file_id = ObjectId()
+        pending = bytearray()
+        batch = []
+        length = 0
+        n = 0
+        try:
+            async for data in body:
+                length += len(data)
+                if length > max_bytes:
+                    raise RecordingTooLarge(f"Recording exceeds {max_bytes} bytes")
+                pending += data
+                while len(pending) >= self.chunk_size:
+                    batch.append({"files_id": file_id, "n": n, "data": bytes(pending[:self.chunk_size])})
+                    del pending[:self.chunk_size]
+                    n += 1
+                    if len(batch) >= self.batch_chunks:
+                        await self.chunks.insert_many(batch)
+                        batch = []
+            if pending:
+                batch.append({"files_id": file_id, "n": n, "data": bytes(pending)})
+            if batch:
+                await self.chunks.insert_many(batch)
+
+            file_doc = {
+                "_id": file_id,
+                "length": length,
+                "chunkSize": self.chunk_size,
+                "uploadDate": datetime.utcnow(),
+                "filename": f"{user_id}/{session_id}",
+                "metadata": {"user_id": user_id, "session_id": session_id, "content_type": content_type},
+            }
+            await self.files.insert_one(file_doc)
+        except BaseException:
+            # Client disconnects and size violations leave no orphaned chunks
+            try:
+                await self.chunks.delete_many({"files_id": file_id})
+            except PyMongoError as e:
+                logger.error("Could not clean up chunks of aborted recording %s: %s", file_id, e)
+            raise
+
+        metadata = file_doc["metadata"]
+        try:
+            await self.purge_superseded(metadata["user_id"], metadata["session_id"])
+        except PyMongoError as e:
+            logger.error("Could not delete superseded recordings of %s: %s", file_doc["filename"], e)
+        if self.replace_grace > 0:
+            task = asyncio.create_task(self._purge_later(metadata["user_id"], metadata["session_id"]))
+            self._purges.add(task)
+            task.add_done_callback(self._purges.discard)
+        return file_doc
+
+    async def purge_superseded(self, user_id: str, session_id: str) -> int:
+        """
+        Delete the session's recordings superseded more than ``replace_grace``
+        seconds ago. A file counts as superseded when the next newer upload
+        completed, so concurrent uploads never delete the latest one and the
+        last to complete wins, matching latest().
+        """
+        docs = await self.files.find(
+            {"metadata.user_id": user_id, "metadata.session_id": session_id},
+            {"_id": 1, "uploadDate": 1},
+        ).sort([("uploadDate", -1), ("_id", -1)]).to_list(None)
+        cutoff = datetime.utcnow() - timedelta(seconds=self.replace_grace)
+        deleted = 0
+        for newer, doc in zip(docs, docs[1:]):
+            if newer["uploadDate"] > cutoff:
+                continue
+            # Drop the file document first so no new download can start on it
+            await self.files.delete_many({"_id": doc["_id"]})
+            await self.chunks.delete_many({"files_id": doc["_id"]})
+            deleted += 1
+        return deleted
+
+    async def _purge_later(self, user_id: str, session_id: str) -> None:
+        await asyncio.sleep(self.replace_grace)
+        try:
+            await self.purge_superseded(user_id, session_id)
+        except PyMongoError as e:
+            logger.error("Could not delete superseded recordings of %s/%s: %s", user_id, session_id, e)
+
+    async def stop(self) -> None:
+        """Cancel pending deletions; the next upload per session retries them"""
+        for task in list(self._purges):
+            task.cancel()
+        await asyncio.gather(*self._purges, return_exceptions=True)
+        self._purges.clear()
+
+    async def latest(self, user_id: str, session_id: str) -> Optional[dict]:
+        docs = await self.files.find({"metadata.user_id": user_id, "metadata.session_id": session_id}) \
+            .sort([("uploadDate", -1), ("_id", -1)]) \
+            .limit(1) \
+            .to_list(1)
+        return docs[0] if docs else None
+
+    async def iter_range(self, file_doc: dict, start: int, end: int) -> AsyncIterator[bytes]:
+        """Yield the bytes ``start``..``end`` (inclusive) of a stored recording"""
+        chunk_size = file_doc["chunkSize"]
+        first, last = start // chunk_size, end // chunk_size
+        cursor = self.chunks.find(
+            {"files_id": file_doc["_id"], "n": {"$gte": first, "$lte": last}},
+            {"_id": 0, "n": 1, "data": 1},
+        ).sort([("n", 1)]).batch_size(self.batch_chunks)
+
+        expected = first
+        async for chunk in cursor:
+            if chunk["n"] != expected:
+                raise IOError(f"Recording {file_doc['_id']} is missing chunk {expected}")
+            data = memoryview(chunk["data"])
+            offset = chunk["n"] * chunk_size
+            lo = max(start - offset, 0)
+            hi = min(end - offset + 1, len(data))
+            yield chunk["data"] if lo == 0 and hi == len(data) else bytes(data[lo:hi])
+            expected += 1
+        if expected != last + 1:
+            raise IOError(f"Recording {file_doc['_id']} is missing chunk {expected}")
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import uuid
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Union
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+from tracing import span
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, stdlib json is the fallback
+    orjson = None
+
+# "auto" uses orjson when installed, "stdlib" forces the json module
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'auto').lower()
+USE_ORJSON = orjson is not None and JSON_ENCODER in ("auto", "orjson")
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode plain Python data (dicts, lists, datetimes) to JSON bytes"""
+    if USE_ORJSON:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON with the same encoder choice as dumps()"""
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: orjson when available, compact stdlib otherwise"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def _adapter(tp: Any) -> TypeAdapter:
+    adapter = _adapters.get(tp)
+    if adapter is None:
+        adapter = _adapters[tp] = TypeAdapter(tp)
+    return adapter
+
+
+def model_bytes(content: Any, tp: Any = None) -> bytes:
+    """Encode a model (or a value of type ``tp``) with a cached TypeAdapter"""
+    with span("encode.json"):
+        return _adapter(tp if tp is not None else type(content)).dump_json(content)
+
+
+def model_response(
+    content: Any,
+    tp: Any = None,
+    status_code: int = 200,
+    headers: Optional[dict] = None,
+) -> Response:
+    """
+    Serialize pydantic models straight to bytes, skipping jsonable_encoder.
+
+    ``content`` is a model instance, or any value matching the type ``tp``
+    (e.g. ``List[StatusCheck]``) which is then encoded with a cached
+    TypeAdapter.
+    """
+    body = model_bytes(content, tp)
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+def make_etag(body: Union[bytes, str]) -> str:
+    """Strong ETag derived from the response body"""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+# Content codings CompressionMiddleware may append to a strong ETag
+ETAG_CODINGS = ("gzip", "br", "zstd")
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """
+    Give a strong ETag a per-coding suffix (``"abc"`` -> ``"abc-gzip"``).
+
+    A strong validator identifies the exact bytes sent, so the compressed
+    representation needs its own; weak ETags are returned unchanged.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+def strip_etag_coding(etag: str) -> str:
+    """Undo encoded_etag(), mapping a coded ETag back to the resource's"""
+    for coding in ETAG_CODINGS:
+        suffix = f'-{coding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    Evaluate an If-None-Match / If-Match header value against ``etag``.
+
+    If-None-Match uses weak comparison (W/ prefixes ignored); If-Match must
+    pass ``weak=False`` and only matches strong validators. Validators
+    carrying a content-coding suffix match the uncompressed ``etag``.
+    """
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if strip_etag_coding(candidate) == etag:
+            return True
+    return False
+
+
+def conditional_response(request, body: Union[bytes, str], etag: Optional[str] = None, headers: Optional[dict] = None) -> Response:
+    """Return 304 when If-None-Match matches, otherwise the JSON body with its ETag"""
+    etag = etag or make_etag(body)
+    headers = {**(headers or {}), "ETag": etag}
+    if request is not None and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, headers=headers, media_type="application/json")
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from indexes import IndexSpec, register_index
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "token_revocations"
+
+# Incremental sync scans by revoked_at; Mongo drops entries once no token they
+# could match is still valid
+register_index(IndexSpec(COLLECTION, (("revoked_at", ASCENDING),), "revoked_at"))
+register_index(IndexSpec(COLLECTION, (("expires_at", ASCENDING),), "expires_at_ttl", expire_after_seconds=0))
+
+
+def _epoch(value: datetime) -> float:
+    """Epoch seconds for the naive UTC datetimes stored in Mongo"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def token_id(claims: dict) -> Optional[str]:
+    """The per-token identifier: ``jti``, or Supabase's ``session_id`` when absent"""
+    return claims.get("jti") or claims.get("session_id")
+
+
+class RevocationList:
+    """
+    In-memory mirror of the token_revocations collection.
+
+    Two kinds of entry are kept: revoked token ids (``jti``) and per-``sub``
+    cutoffs revoking every token issued before a given time. is_revoked() is
+    a dict lookup with no I/O. A background task pulls entries written since
+    the last sync every ``refresh_interval`` seconds (re-reading an
+    ``overlap`` window so writes committed out of order are not missed), and
+    forgets entries whose tokens can no longer be valid.
+
+    A plain dict beats a pure-Python Bloom filter here: hashing a short string
+    once is cheaper than computing k filter positions, and the set only holds
+    revocations younger than the maximum token lifetime.
+    """
+
+    def __init__(self, collection, refresh_interval: float = 5.0, max_token_lifetime: float = 86400.0, overlap: float = 30.0):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self.max_token_lifetime = max_token_lifetime
+        self.overlap = overlap
+
+        # token id -> expiry (epoch seconds)
+        self._tokens: Dict[str, float] = {}
+        # sub -> (cutoff epoch seconds, expiry epoch seconds)
+        self._subjects: Dict[str, Tuple[float, float]] = {}
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.checks = 0
+        self.rejections = 0
+        self.syncs = 0
+        self.sync_failures = 0
+        self.last_sync: Optional[datetime] = None
+
+    def is_revoked(self, claims: dict) -> bool:
+        self.checks += 1
+        tid = token_id(claims)
+        if tid is not None and tid in self._tokens:
+            self.rejections += 1
+            return True
+        cutoff = self._subjects.get(claims.get("sub"))
+        if cutoff is not None:
+            iat = claims.get("iat")
+            # Without iat we cannot show the token was issued after the cutoff
+            if not isinstance(iat, (int, float)) or iat < cutoff[0]:
+                self.rejections += 1
+                return True
+        return False
+
+    def _apply(self, doc: dict) -> None:
+        expires = _epoch(doc["expires_at"]) if doc.get("expires_at") else 0.0
+        if doc["kind"] == "token":
+            self._tokens[doc["token_id"]] = expires
+        elif doc["kind"] == "sub":
+            current = self._subjects.get(doc["sub"])
+            cutoff = _epoch(doc["revoked_before"])
+            if current is None or cutoff >= current[0]:
+                self._subjects[doc["sub"]] = (cutoff, expires)
+
+    def _prune(self) -> None:
+        now = time.time()
+        self._tokens = {tid: exp for tid, exp in self._tokens.items() if exp > now}
+        self._subjects = {sub: entry for sub, entry in self._subjects.items() if entry[1] > now}
+
+    async def sync(self) -> int:
+        """Load entries revoked since the last sync (everything on the first call)"""
+        query = {"expires_at": {"$gt": datetime.utcnow()}}
+        if self._watermark is not None:
+            query["revoked_at"] = {"$gte": self._watermark - timedelta(seconds=self.overlap)}
+        count = 0
+        try:
+            async for doc in self.collection.find(query).sort([("revoked_at", 1)]):
+                self._apply(doc)
+                if self._watermark is None or doc["revoked_at"] > self._watermark:
+                    self._watermark = doc["revoked_at"]
+                count += 1
+        except PyMongoError as e:
+            self.sync_failures += 1
+            logger.error("Token revocation sync failed: %s", e)
+            return count
+        if self._watermark is None:
+            self._watermark = datetime.utcnow()
+        self._prune()
+        self.syncs += 1
+        self.last_sync = datetime.utcnow()
+        return count
+
+    async def revoke_token(self, tid: str, sub: Optional[str], exp: Optional[float] = None, reason: Optional[str] = None) -> None:
+        """Revoke one token by id until its ``exp`` (or the maximum token lifetime)"""
+        now = datetime.utcnow()
+        expires_at = datetime.utcfromtimestamp(exp) if exp else now + timedelta(seconds=self.max_token_lifetime)
+        doc = {
+            "kind": "token",
+            "token_id": tid,
+            "sub": sub,
+            "revoked_at": now,
+            "expires_at": expires_at,
+            "reason": reason,
+        }
+        await self.collection.update_one({"_id": f"token:{tid}"}, {"$set": doc}, upsert=True)
+        self._apply(doc)
+
+    async def revoke_subject(self, sub: str, reason: Optional[str] = None) -> None:
+        """
+        Revoke every token issued to ``sub`` before the current second.
+
+        ``iat`` has whole-second resolution, so the cutoff is truncated to the
+        second: a token issued in the same second as the revocation stays
+        valid. Otherwise a re-login right after "log out everywhere" would be
+        rejected for its whole lifetime. A token minted earlier in that same
+        second also survives; revoke it by id if that matters.
+        """
+        now = datetime.utcnow()
+        doc = {
+            "kind": "sub",
+            "sub": sub,
+            "revoked_before": now.replace(microsecond=0),
+            "revoked_at": now,
+            "expires_at": now + timedelta(seconds=self.max_token_lifetime),
+            "reason": reason,
+        }
+        await self.collection.update_one({"_id": f"sub:{sub}"}, {"$set": doc}, upsert=True)
+        self._apply(doc)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.sync()
+
+    async def start(self) -> None:
+        await self.sync()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "revoked_tokens": len(self._tokens),
+            "revoked_subjects": len(self._subjects),
+            "checks": self.checks,
+            "rejections": self.rejections,
+            "syncs": self.syncs,
+            "sync_failures": self.sync_failures,
+            "last_sync": self.last_sync.isoformat() if self.last_sync else None,
+        }
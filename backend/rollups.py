@@ -0,0 +1,135 @@
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, UpdateOne
+
+from indexes import IndexSpec, register_index
+
+COLLECTION = "status_rollups"
+
+# Rollup granularities, maintained on every status check insert
+INTERVALS = ("minute", "hour", "day")
+
+# Days each granularity is kept; buckets carry their own expires_at
+RETENTION_DAYS = {
+    "minute": int(os.environ.get('ROLLUP_RETENTION_MINUTE_DAYS', '7')),
+    "hour": int(os.environ.get('ROLLUP_RETENTION_HOUR_DAYS', '90')),
+    "day": int(os.environ.get('ROLLUP_RETENTION_DAY_DAYS', '730')),
+}
+
+register_index(IndexSpec(COLLECTION, (("expires_at", ASCENDING),), "expires_at_ttl", expire_after_seconds=0))
+
+
+def truncate(timestamp: datetime, interval: str) -> datetime:
+    """Start of the ``interval`` bucket containing ``timestamp``, as naive UTC"""
+    if timestamp.tzinfo is not None:
+        # Buckets are UTC; an aware 01:30+02:00 belongs to the 23:00 hour
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    if interval == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if interval == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if interval == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown rollup interval: {interval}")
+
+
+def rollup_updates(status_checks: Iterable[dict]) -> List[UpdateOne]:
+    """
+    Collapse status checks into one $inc upsert per (interval, bucket, client).
+
+    A batch of N checks from the same client in the same minute becomes three
+    writes (minute, hour and day bucket), not 3 * N.
+    """
+    counts = Counter()
+    for check in status_checks:
+        for interval in INTERVALS:
+            counts[(interval, truncate(check["timestamp"], interval), check["client_name"])] += 1
+    return [
+        UpdateOne(
+            {"interval": interval, "bucket": bucket, "client_name": client_name},
+            {"$inc": {"count": count}, "$setOnInsert": {"expires_at": expires_at(interval, bucket)}},
+            upsert=True,
+        )
+        for (interval, bucket, client_name), count in counts.items()
+    ]
+
+
+def expires_at(interval: str, bucket: datetime) -> datetime:
+    return bucket + timedelta(days=RETENTION_DAYS[interval])
+
+
+async def record(collection, status_checks: List[dict]) -> None:
+    """Add freshly inserted status checks to the rollup buckets"""
+    updates = rollup_updates(status_checks)
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+
+
+def bucket_query(interval: str, since: datetime, until: datetime, client_name: Optional[str] = None) -> dict:
+    query = {"interval": interval, "bucket": {"$gte": truncate(since, interval), "$lt": until}}
+    if client_name:
+        query["client_name"] = client_name
+    return query
+
+
+def raw_pipeline(interval: str, since: datetime, until: datetime, client_name: Optional[str] = None) -> List[dict]:
+    """
+    Equivalent counts computed from raw status_checks with $dateTrunc.
+
+    Used by backfill() and to cross-check the rollups; cost is O(raw events).
+    """
+    match = {"timestamp": {"$gte": truncate(since, interval), "$lt": until}}
+    if client_name:
+        match["client_name"] = client_name
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": interval}},
+                "client_name": "$client_name",
+            },
+            "count": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": 0,
+            "bucket": "$_id.bucket",
+            "client_name": "$_id.client_name",
+            "count": 1,
+        }},
+        {"$sort": {"bucket": 1, "client_name": 1}},
+    ]
+
+
+async def backfill(
+    status_checks,
+    rollups,
+    since: datetime,
+    until: datetime,
+    intervals: Iterable[str] = INTERVALS,
+) -> Dict[str, int]:
+    """
+    Rebuild rollup buckets in [since, until) from raw status checks.
+
+    Counts are overwritten, so rerunning is safe. ``until`` is rounded down
+    to a bucket boundary per interval so no bucket is set from a partial
+    range; checks recorded while a still-open bucket is rebuilt may be lost
+    from it, so backfill ranges that have stopped receiving traffic.
+    Returns the number of buckets written per interval.
+    """
+    written = {}
+    for interval in intervals:
+        end = truncate(until, interval)
+        updates = []
+        async for row in status_checks.aggregate(raw_pipeline(interval, since, end)):
+            updates.append(UpdateOne(
+                {"interval": interval, "bucket": row["bucket"], "client_name": row["client_name"]},
+                {"$set": {"count": row["count"], "expires_at": expires_at(interval, row["bucket"])}},
+                upsert=True,
+            ))
+        if updates:
+            await rollups.bulk_write(updates, ordered=False)
+        written[interval] = len(updates)
+    return written
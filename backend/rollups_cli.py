@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Rebuild status_rollups buckets from raw status_checks
+
+    python rollups_cli.py --since 2024-01-01 --until 2024-02-01
+    python rollups_cli.py --since 2024-01-01 --interval hour --interval day
+
+Existing bucket counts in the range are overwritten, so it is safe to rerun.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import rollups
+
+ROOT_DIR = Path(__file__).parent
+
+app = typer.Typer(add_completion=False, help=__doc__)
+
+
+async def run_backfill(since: datetime, until: datetime, intervals: List[str]) -> dict:
+    load_dotenv(ROOT_DIR / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        return await rollups.backfill(db.status_checks, db[rollups.COLLECTION], since, until, intervals)
+    finally:
+        client.close()
+
+
+@app.command()
+def main(
+    since: datetime = typer.Option(..., help="first bucket to rebuild"),
+    until: Optional[datetime] = typer.Option(None, help="rebuild buckets before this time (default: now)"),
+    interval: Optional[List[str]] = typer.Option(None, help=f"one of: {', '.join(rollups.INTERVALS)} (repeatable, default all)"),
+):
+    intervals = interval or list(rollups.INTERVALS)
+    for name in intervals:
+        if name not in rollups.INTERVALS:
+            raise typer.BadParameter(f"unknown interval {name}", param_hint="--interval")
+    written = asyncio.run(run_backfill(since, until or datetime.utcnow(), intervals))
+    for name, count in written.items():
+        typer.echo(f"{name}: {count} buckets")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,31 +1,221 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from jose import jwt, JWTError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from typing import Any, Dict, List, Optional
+import asyncio
+import base64
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from indexes import ensure_indexes
+from content_encoding import DEFAULT_CONTENT_TYPES, CompressionMiddleware, CompressionStats
+from events import ChangeStreamFeed, EventHub, EventStreamResponse, SubscriberLimit
+from export import DATASETS, FORMATS, ExportError, build_query, export_batches, make_encoder
+from jwks import ASYMMETRIC_ALGORITHMS, JWKSKeyStore
+from metrics import (
+    MetricsMiddleware,
+    MongoCommandListener,
+    PoolListener,
+    jwt_verify_duration_seconds,
+    registry,
+    stats_collector,
+)
+from profile_cache import CachedProfile, MemoryBackend, ProfileCache
+from profile_patch import PatchError, compile_merge_patch, compile_operations
+from recordings import RangeNotSatisfiable, RecordingStore, RecordingTooLarge, parse_range
+from revocation import RevocationList, token_id
+from rate_limit import SingleFlight, TokenBucketLimiter, parse_limit
+import rollups
+from responses import (
+    FastJSONResponse,
+    conditional_response,
+    dumps,
+    etag_matches,
+    make_etag,
+    model_bytes,
+    model_response,
+)
+from status_buffer import StatusBuffer, StatusBufferFull
+from telemetry import FrameError, TelemetryIngest, TelemetryLimit, decode_frame, ensure_collection as ensure_telemetry_collection
+from token_cache import TokenCache
+from tracing import FileSpanExporter, MongoSpanListener, Tracer, TracingMiddleware, span, traced
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection (pool sizing and timeouts are tunable from .env)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+pool_listener = PoolListener()
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+    "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000')),
+    "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000')),
+    "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+    "socketTimeoutMS": int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '30000')),
+}
+MONGO_WARMUP_CONNECTIONS = int(os.environ.get('MONGO_WARMUP_CONNECTIONS', '10'))
+HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT', '2'))
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[MongoCommandListener(), pool_listener, MongoSpanListener()],
+    **MONGO_POOL_OPTIONS
+)
 db = client[os.environ['DB_NAME']]
 
 # Supabase JWT configuration
 SUPABASE_JWT_SECRET = os.environ['SUPABASE_JWT_SECRET']
 security = HTTPBearer()
+# EventSource cannot send headers, so streams also accept ?access_token=
+stream_security = HTTPBearer(auto_error=False)
+
+# Revoked tokens (jti / sub cutoffs), mirrored in memory and checked on every request
+revocations = RevocationList(
+    db.token_revocations,
+    refresh_interval=float(os.environ.get('REVOCATION_REFRESH_INTERVAL', '5')),
+    max_token_lifetime=float(os.environ.get('TOKEN_MAX_LIFETIME', '86400')),
+)
+EXPORT_ROLES = {
+    r.strip() for r in os.environ.get('EXPORT_ROLES', 'service_role').split(",") if r.strip()
+}
+REVOCATION_ADMIN_ROLES = {
+    r.strip() for r in os.environ.get('REVOCATION_ADMIN_ROLES', 'service_role').split(",") if r.strip()
+}
+# Roles allowed to read operational endpoints (/api/metrics, cache and buffer stats)
+OPS_ROLES = {
+    r.strip() for r in os.environ.get('OPS_ROLES', 'service_role').split(",") if r.strip()
+}
+
+# Optional JWKS (local file or URL) for RS256/ES256 tokens
+SUPABASE_JWKS_SOURCE = os.environ.get('SUPABASE_JWKS_SOURCE', '')
+if SUPABASE_JWKS_SOURCE and not SUPABASE_JWKS_SOURCE.startswith(("http://", "https://")):
+    SUPABASE_JWKS_SOURCE = str(ROOT_DIR / SUPABASE_JWKS_SOURCE)
+jwks_store = JWKSKeyStore(
+    SUPABASE_JWKS_SOURCE,
+    refresh_interval=float(os.environ.get('JWKS_REFRESH_INTERVAL', '600')),
+    min_refresh_interval=float(os.environ.get('JWKS_MIN_REFRESH_INTERVAL', '30')),
+    negative_ttl=float(os.environ.get('JWKS_NEGATIVE_TTL', '300')),
+) if SUPABASE_JWKS_SOURCE else None
+
+# Verified token cache (repeat requests with the same bearer skip jwt.decode)
+token_cache = TokenCache(
+    maxsize=int(os.environ.get('TOKEN_CACHE_SIZE', '10000')),
+    max_ttl=float(os.environ.get('TOKEN_CACHE_MAX_TTL', '300')),
+)
+
+# Serialized profile cache, refreshed on every profile write
+profile_cache = ProfileCache(
+    MemoryBackend(maxsize=int(os.environ.get('PROFILE_CACHE_SIZE', '10000'))),
+    ttl=float(os.environ.get('PROFILE_CACHE_TTL', '60')),
+    enabled=os.environ.get('PROFILE_CACHE_ENABLED', 'true').lower() == 'true',
+)
+
+# Optional write-behind buffering for POST /api/status
+STATUS_BUFFER_ENABLED = os.environ.get('STATUS_BUFFER_ENABLED', 'false').lower() == 'true'
+status_buffer = StatusBuffer(
+    db.status_checks,
+    batch_size=int(os.environ.get('STATUS_BUFFER_BATCH_SIZE', '500')),
+    flush_interval=float(os.environ.get('STATUS_BUFFER_FLUSH_INTERVAL', '0.25')),
+    max_queue=int(os.environ.get('STATUS_BUFFER_MAX_QUEUE', '10000')),
+    put_timeout=float(os.environ.get('STATUS_BUFFER_PUT_TIMEOUT', '1.0')),
+    after_flush=lambda checks: rollups.record(db.status_rollups, checks),
+)
+
+# Per-caller token buckets ("rate:burst" per second) and read coalescing
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# X-Forwarded-For is only honoured behind proxies that append to it;
+# RATE_LIMIT_PROXY_DEPTH is how many such proxies sit in front of the app
+RATE_LIMIT_TRUST_FORWARDED = os.environ.get('RATE_LIMIT_TRUST_FORWARDED', 'false').lower() == 'true'
+RATE_LIMIT_PROXY_DEPTH = max(1, int(os.environ.get('RATE_LIMIT_PROXY_DEPTH', '1')))
+rate_limiters = {
+    "profile": TokenBucketLimiter(*parse_limit(os.environ.get('RATE_LIMIT_PROFILE', '10:30'))),
+}
+# /api/status is unauthenticated, so its limit is keyed by client IP and off
+# unless RATE_LIMIT_STATUS is set (e.g. '20:60'). Behind a proxy, also set
+# RATE_LIMIT_TRUST_FORWARDED=true, otherwise every caller shares the proxy's
+# address and the per-client limit becomes one global cap.
+RATE_LIMIT_STATUS = os.environ.get('RATE_LIMIT_STATUS', '')
+if RATE_LIMIT_STATUS:
+    rate_limiters["status"] = TokenBucketLimiter(*parse_limit(RATE_LIMIT_STATUS))
+profile_reads = SingleFlight()
+
+# Roles (JWT "role" claim) allowed to read other users' profiles
+PROFILE_LOOKUP_ROLES = {
+    r.strip() for r in os.environ.get('PROFILE_LOOKUP_ROLES', 'service_role').split(",") if r.strip()
+}
+
+# Response compression (br / zstd are offered only when their packages are installed)
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+COMPRESSION_ENCODINGS = [e.strip() for e in os.environ.get('COMPRESSION_ENCODINGS', 'br,zstd,gzip').split(",") if e.strip()]
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_CONTENT_TYPES = [
+    t.strip() for t in os.environ.get('COMPRESSION_CONTENT_TYPES', ",".join(DEFAULT_CONTENT_TYPES)).split(",") if t.strip()
+]
+compression_stats = CompressionStats()
+
+# Request tracing: spans are exported as OTLP/JSON lines to TRACE_EXPORT_FILE
+TRACE_EXPORT_FILE = os.environ.get('TRACE_EXPORT_FILE', '')
+span_exporter = FileSpanExporter(
+    TRACE_EXPORT_FILE,
+    service_name=os.environ.get('TRACE_SERVICE_NAME', 'core-api'),
+) if TRACE_EXPORT_FILE else None
+tracer = Tracer(
+    sample_rate=float(os.environ.get('TRACE_SAMPLE_RATE', '0.01')),
+    exporter=span_exporter,
+    server_timing=os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() == 'true',
+)
+
+# Change notifications pushed over SSE ("auto" uses change streams when the
+# deployment supports them, "local" only sees this worker's writes)
+EVENTS_SOURCE = os.environ.get('EVENTS_SOURCE', 'auto').lower()
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', '15'))
+event_hub = EventHub(
+    max_subscribers=int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', '1000')),
+    max_per_user=int(os.environ.get('EVENTS_MAX_PER_USER', '5')),
+    queue_size=int(os.environ.get('EVENTS_QUEUE_SIZE', '100')),
+)
+change_feed = ChangeStreamFeed(event_hub, db) if EVENTS_SOURCE == 'auto' else None
+
+# VR session recordings (GridFS layout in the "recordings" bucket)
+RECORDING_MAX_BYTES = int(os.environ.get('RECORDING_MAX_BYTES', str(2 * 1024 ** 3)))
+recording_store = RecordingStore(
+    db,
+    chunk_size=int(os.environ.get('RECORDING_CHUNK_SIZE', str(1024 * 1024))),
+    batch_chunks=int(os.environ.get('RECORDING_BATCH_CHUNKS', '8')),
+    # Seconds a replaced recording stays readable for downloads in progress
+    replace_grace=float(os.environ.get('RECORDING_REPLACE_GRACE', '300')),
+)
+
+# In-session telemetry over WebSocket, written to a time-series collection
+TELEMETRY_RETENTION_DAYS = int(os.environ.get('TELEMETRY_RETENTION_DAYS', '30'))
+TELEMETRY_STALL_TIMEOUT = float(os.environ.get('TELEMETRY_STALL_TIMEOUT', '10'))
+TELEMETRY_AUTH_RECHECK = float(os.environ.get('TELEMETRY_AUTH_RECHECK', '5'))
+telemetry_ingest = TelemetryIngest(
+    db.telemetry,
+    batch_size=int(os.environ.get('TELEMETRY_BATCH_SIZE', '1000')),
+    flush_interval=float(os.environ.get('TELEMETRY_FLUSH_INTERVAL', '0.5')),
+    max_buffer=int(os.environ.get('TELEMETRY_MAX_BUFFER', '20000')),
+    max_frame_samples=int(os.environ.get('TELEMETRY_MAX_FRAME_SAMPLES', '5000')),
+    max_connections=int(os.environ.get('TELEMETRY_MAX_CONNECTIONS', '500')),
+)
 
 # Create the main app without a prefix
-app = FastAPI(title="CORE - Conscious Observation Reconstruction Engine API")
+app = FastAPI(
+    title="CORE - Conscious Observation Reconstruction Engine API",
+    default_response_class=FastJSONResponse,
+)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -39,6 +229,11 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusRollup(BaseModel):
+    bucket: datetime
+    client_name: str
+    count: int
+
 class UserProfile(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     supabase_uid: str
@@ -59,10 +254,60 @@ class UserProfileUpdate(BaseModel):
     therapy_preferences: Optional[List[str]] = None
     vr_settings: Optional[dict] = None
 
+class ProfileLookup(BaseModel):
+    uids: List[str] = Field(..., min_length=1, max_length=500)
+    fields: Optional[List[str]] = None
+
+class TokenRevoke(BaseModel):
+    all_sessions: bool = False
+
+class TokenRevocation(BaseModel):
+    sub: Optional[str] = None
+    jti: Optional[str] = None
+    reason: Optional[str] = None
+
+class UserProfilePatch(BaseModel):
+    # A merge patch sent as application/json must fail, not compile to nothing
+    model_config = ConfigDict(extra="forbid")
+    
+    set: Optional[Dict[str, Any]] = None
+    unset: Optional[List[str]] = None
+    add_to_set: Optional[Dict[str, List[Any]]] = None
+
+class VRSession(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    title: str
+    date: datetime = Field(default_factory=datetime.utcnow)
+    duration: int
+    type: str
+    notes: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class VRSessionCreate(BaseModel):
+    title: str
+    date: Optional[datetime] = None
+    duration: int
+    type: str
+    notes: Optional[str] = None
+
+class VRRecording(BaseModel):
+    session_id: str
+    length: int
+    content_type: str
+    uploaded_at: datetime
+    etag: str
+
+VR_SESSION_FIELDS = set(VRSession.__fields__)
+USER_PROFILE_FIELDS = set(UserProfile.__fields__)
+
 # Authentication dependency
+@traced("auth")
 async def get_current_user(cred: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
-    Verify JWT token from Supabase and return user information
+    Verify JWT token from Supabase and return user information.
+    HS256 tokens use SUPABASE_JWT_SECRET; RS/ES tokens are checked against
+    the JWKS key named by their ``kid`` header.
     """
     if not cred:
         raise HTTPException(
@@ -71,18 +316,38 @@ async def get_current_user(cred: HTTPAuthorizationCredentials = Depends(security
             headers={"WWW-Authenticate": 'Bearer realm="auth_required"'},
         )
     
+    cached = token_cache.get(cred.credentials)
+    if cached is not None:
+        # Cached claims are re-checked so revocation applies immediately
+        reject_revoked(cached)
+        return cached
+    
     try:
-        payload = jwt.decode(
-            cred.credentials,
-            SUPABASE_JWT_SECRET,
-            audience="authenticated",
-            algorithms=["HS256"],
-        )
-        return {
+        header = jwt.get_unverified_header(cred.credentials)
+        alg = header.get("alg")
+        if alg in ASYMMETRIC_ALGORITHMS:
+            with span("auth.jwks_key", kid=header.get("kid")):
+                key = await jwks_store.get_key(header.get("kid"), alg) if jwks_store else None
+            if key is None:
+                raise JWTError("Unknown signing key")
+            algorithms = [alg]
+        else:
+            key, algorithms = SUPABASE_JWT_SECRET, ["HS256"]
+        
+        with jwt_verify_duration_seconds.time(), span("auth.jwt_decode", alg=alg):
+            payload = jwt.decode(
+                cred.credentials,
+                key,
+                audience="authenticated",
+                algorithms=algorithms,
+            )
+        user = {
             "sub": payload.get("sub"),
             "email": payload.get("email"),
             "role": payload.get("role", "authenticated"),
-            "exp": payload.get("exp")
+            "exp": payload.get("exp"),
+            "iat": payload.get("iat"),
+            "jti": token_id(payload),
         }
     except JWTError as e:
         raise HTTPException(
@@ -90,6 +355,75 @@ async def get_current_user(cred: HTTPAuthorizationCredentials = Depends(security
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": 'Bearer realm="auth_required"'},
         )
+    
+    reject_revoked(user)
+    token_cache.put(cred.credentials, user)
+    return user
+
+def reject_revoked(user: dict) -> None:
+    if revocations.is_revoked(user):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": 'Bearer realm="auth_required", error="invalid_token"'},
+        )
+
+# Rate limiting dependencies
+def enforce_rate_limit(scope: str, key: str) -> None:
+    allowed, retry_after = rate_limiters[scope].acquire(key)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+
+def client_ip(request: Request) -> str:
+    """
+    The caller's address for rate limiting. Left-hand X-Forwarded-For hops
+    are client-supplied, so the hop added by the outermost trusted proxy
+    (RATE_LIMIT_PROXY_DEPTH from the right) is used.
+    """
+    if RATE_LIMIT_TRUST_FORWARDED:
+        hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(hops) >= RATE_LIMIT_PROXY_DEPTH:
+            return hops[-RATE_LIMIT_PROXY_DEPTH]
+    return request.client.host if request.client else "unknown"
+
+def user_rate_limited(scope: str):
+    """Authenticate, then spend a token from the caller's ``scope`` bucket"""
+    async def dependency(user: dict = Depends(get_current_user)) -> dict:
+        if RATE_LIMIT_ENABLED:
+            enforce_rate_limit(scope, user["sub"])
+        return user
+    return dependency
+
+def ip_rate_limited(scope: str):
+    """Spend a token from the client IP's ``scope`` bucket (unauthenticated routes, opt-in)"""
+    async def dependency(request: Request) -> None:
+        if RATE_LIMIT_ENABLED and scope in rate_limiters:
+            enforce_rate_limit(scope, client_ip(request))
+    return dependency
+
+async def get_stream_user(
+    access_token: Optional[str] = None,
+    cred: Optional[HTTPAuthorizationCredentials] = Depends(stream_security)
+) -> dict:
+    """Like get_current_user, but also accepts the token as ?access_token="""
+    if cred is None and access_token:
+        cred = HTTPAuthorizationCredentials(scheme="Bearer", credentials=access_token)
+    return await get_current_user(cred)
+
+def require_role(roles: set):
+    """Authenticate and require the token's role claim to be one of ``roles``"""
+    async def dependency(user: dict = Depends(get_current_user)) -> dict:
+        if user.get("role") not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient role for this operation"
+            )
+        return user
+    return dependency
 
 # Authentication routes
 @api_router.get("/auth/me")
@@ -110,124 +444,799 @@ async def protected_route(user: dict = Depends(get_current_user)):
         "platform": "CORE - Conscious Observation Reconstruction Engine"
     }
 
+@api_router.post("/auth/revoke")
+async def revoke_own_tokens(request: TokenRevoke, user: dict = Depends(get_current_user)):
+    """Revoke the presented token, or with all_sessions every token issued to the caller so far"""
+    if request.all_sessions:
+        await revocations.revoke_subject(user["sub"], reason="user_logout_all")
+        # The subject cutoff spares tokens issued in the current second
+        if user.get("jti"):
+            await revocations.revoke_token(user["jti"], user["sub"], user.get("exp"), reason="user_logout_all")
+        return {"revoked": "all_sessions"}
+    if not user.get("jti"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token has no jti or session_id; revoke all_sessions instead"
+        )
+    await revocations.revoke_token(user["jti"], user["sub"], user.get("exp"), reason="user_logout")
+    return {"revoked": "token"}
+
+@api_router.post("/auth/revocations")
+async def revoke_tokens(revocation: TokenRevocation, user: dict = Depends(require_role(REVOCATION_ADMIN_ROLES))):
+    """Revoke a token by jti or every token of a sub issued so far (privileged)"""
+    if bool(revocation.sub) == bool(revocation.jti):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of sub or jti"
+        )
+    if revocation.sub:
+        await revocations.revoke_subject(revocation.sub, reason=revocation.reason)
+        return {"revoked": "sub", "sub": revocation.sub}
+    await revocations.revoke_token(revocation.jti, None, reason=revocation.reason)
+    return {"revoked": "jti", "jti": revocation.jti}
+
+# User profile helpers
+async def upsert_user_profile(user: dict, set_fields: Optional[dict] = None) -> dict:
+    """
+    Atomically fetch-or-create the caller's profile in one round trip.
+
+    ``set_fields`` are applied to both new and existing documents; every other
+    UserProfile field is only written when the document is first inserted, so
+    concurrent first requests converge on a single profile.
+    """
+    set_fields = dict(set_fields or {})
+    defaults = UserProfile(supabase_uid=user["sub"], email=user["email"]).dict()
+    set_on_insert = {k: v for k, v in defaults.items() if k not in set_fields}
+
+    update = {"$setOnInsert": set_on_insert}
+    if set_fields:
+        update["$set"] = set_fields
+
+    for attempt in range(2):
+        try:
+            return await db.user_profiles.find_one_and_update(
+                {"supabase_uid": user["sub"]},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Lost an upsert race against the unique supabase_uid index; the
+            # retry matches the winner's document instead of inserting.
+            if attempt:
+                raise
+
+async def cache_profile(profile_doc: dict, generation: Optional[int] = None) -> CachedProfile:
+    """
+    Serialize a profile document once and cache it with its ETag.
+
+    Writes pass the post-image and no ``generation``; read-through fills pass
+    profile_cache.generation() taken before the read, so a profile written
+    in the meantime is not overwritten with the older document.
+    """
+    with span("model.UserProfile"):
+        profile = UserProfile(**profile_doc)
+    with span("encode.json"):
+        body = profile.json()
+    etag = make_etag(body)
+    if generation is None:
+        await profile_cache.set(profile_doc["supabase_uid"], etag, body)
+    else:
+        await profile_cache.fill(profile_doc["supabase_uid"], generation, etag, body)
+    return CachedProfile(etag, body)
+
+async def profile_response(profile_doc: dict, request: Optional[Request] = None) -> Response:
+    cached = await cache_profile(profile_doc)
+    return conditional_response(request, cached.body, cached.etag)
+
 # User profile routes
 @api_router.post("/profile", response_model=UserProfile)
 async def create_user_profile(
     profile_data: UserProfileCreate,
-    user: dict = Depends(get_current_user)
+    user: dict = Depends(user_rate_limited("profile"))
 ):
     """Create or update user profile in MongoDB"""
-    # Check if profile already exists
-    existing_profile = await db.user_profiles.find_one({"supabase_uid": user["sub"]})
+    update_data = profile_data.dict(exclude_none=True)
+    update_data["updated_at"] = datetime.utcnow()
     
-    if existing_profile:
-        # Update existing profile
-        update_data = profile_data.dict(exclude_none=True)
-        update_data["updated_at"] = datetime.utcnow()
+    profile = await upsert_user_profile(user, update_data)
+    event_hub.notify(user["sub"], "profile.updated", {"updated_at": profile["updated_at"]})
+    return await profile_response(profile)
+
+@api_router.get("/profile", response_model=UserProfile)
+async def get_user_profile(request: Request, user: dict = Depends(user_rate_limited("profile"))):
+    """Get user profile from MongoDB, honouring If-None-Match"""
+    with span("cache.profile"):
+        cached = await profile_cache.get(user["sub"])
+    if cached is None:
+        async def load_profile() -> CachedProfile:
+            generation = profile_cache.generation()
+            profile = await db.user_profiles.find_one({"supabase_uid": user["sub"]})
+            if not profile:
+                # Create basic profile if doesn't exist
+                profile = await upsert_user_profile(user)
+            return await cache_profile(profile, generation)
         
-        await db.user_profiles.update_one(
-            {"supabase_uid": user["sub"]},
-            {"$set": update_data}
+        # Concurrent misses for the same user share one Mongo read
+        cached = await profile_reads.do(user["sub"], load_profile)
+    
+    return conditional_response(request, cached.body, cached.etag)
+
+async def apply_profile_update(request: Request, user: dict, update: dict) -> Response:
+    """
+    Apply a Mongo update to the caller's profile and return the post-image.
+
+    With If-Match the update only applies if the stored profile still has
+    that ETag; otherwise 412 Precondition Failed is returned.
+    """
+    update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+    
+    query = {"supabase_uid": user["sub"]}
+    if_match = request.headers.get("if-match")
+    if if_match:
+        current = await db.user_profiles.find_one(query)
+        if current is None:
+            await profile_cache.invalidate(user["sub"])
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User profile not found"
+            )
+        if not etag_matches(if_match, make_etag(UserProfile(**current).json()), weak=False):
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Profile has been modified"
+            )
+        # Only write if nobody else has updated it since we read it
+        query["updated_at"] = current["updated_at"]
+    
+    try:
+        updated_profile = await db.user_profiles.find_one_and_update(
+            query,
+            update,
+            return_document=ReturnDocument.AFTER,
         )
-        
-        # Return updated profile
-        updated_profile = await db.user_profiles.find_one({"supabase_uid": user["sub"]})
-        return UserProfile(**updated_profile)
-    else:
-        # Create new profile
-        profile = UserProfile(
-            supabase_uid=user["sub"],
-            email=user["email"],
-            **profile_data.dict(exclude_none=True)
+    except OperationFailure as e:
+        # e.g. a dotted path traversing a non-object value
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Update could not be applied: {e.details.get('errmsg', str(e)) if e.details else e}"
         )
-        
-        await db.user_profiles.insert_one(profile.dict())
-        return profile
-
-@api_router.get("/profile", response_model=UserProfile)
-async def get_user_profile(user: dict = Depends(get_current_user)):
-    """Get user profile from MongoDB"""
-    profile = await db.user_profiles.find_one({"supabase_uid": user["sub"]})
     
-    if not profile:
-        # Create basic profile if doesn't exist
-        basic_profile = UserProfile(
-            supabase_uid=user["sub"],
-            email=user["email"]
+    if updated_profile is None:
+        await profile_cache.invalidate(user["sub"])
+        if if_match:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Profile has been modified"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User profile not found"
         )
-        await db.user_profiles.insert_one(basic_profile.dict())
-        return basic_profile
     
-    return UserProfile(**profile)
+    event_hub.notify(user["sub"], "profile.updated", {"updated_at": updated_profile["updated_at"]})
+    return await profile_response(updated_profile)
 
 @api_router.put("/profile", response_model=UserProfile)
 async def update_user_profile(
+    request: Request,
     profile_update: UserProfileUpdate,
-    user: dict = Depends(get_current_user)
+    user: dict = Depends(user_rate_limited("profile"))
 ):
-    """Update user profile in MongoDB"""
+    """Update user profile in MongoDB, honouring If-Match"""
     update_data = profile_update.dict(exclude_none=True)
-    update_data["updated_at"] = datetime.utcnow()
+    return await apply_profile_update(request, user, {"$set": update_data})
+
+@api_router.patch("/profile", response_model=UserProfile)
+async def patch_user_profile(request: Request, user: dict = Depends(user_rate_limited("profile"))):
+    """
+    Partially update user profile, touching only the named fields.
+
+    Accepts either a JSON merge patch (Content-Type: application/merge-patch+json)
+    or {"set": {...}, "unset": [...], "add_to_set": {...}} keyed by dotted paths
+    such as "vr_settings.comfort_level". Honours If-Match like PUT.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request body must be JSON"
+        )
     
-    result = await db.user_profiles.update_one(
-        {"supabase_uid": user["sub"]},
-        {"$set": update_data}
-    )
+    try:
+        if request.headers.get("content-type", "").startswith("application/merge-patch+json"):
+            update = compile_merge_patch(body)
+        else:
+            if not isinstance(body, dict):
+                raise PatchError("Patch must be a JSON object")
+            operations = UserProfilePatch(**body)
+            update = compile_operations(operations.set, operations.unset, operations.add_to_set)
+    except (PatchError, ValidationError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if not update:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Patch contains no changes"
+        )
+    
+    return await apply_profile_update(request, user, update)
+
+@api_router.post("/profiles/lookup")
+async def lookup_profiles(lookup: ProfileLookup, user: dict = Depends(require_role(PROFILE_LOOKUP_ROLES))):
+    """
+    Resolve many users' profiles in one call (service-to-service).
+
+    Returns {"profiles": [...]} in request order with null for unknown uids.
+    Full profiles are served from the profile cache where possible and the
+    remainder fetched with a single $in query; ``fields`` projects in Mongo
+    and bypasses the cache.
+    """
+    uids = list(dict.fromkeys(lookup.uids))
     
-    if result.matched_count == 0:
+    if lookup.fields:
+        unknown = set(lookup.fields) - USER_PROFILE_FIELDS
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown profile fields: {', '.join(sorted(unknown))}"
+            )
+        projection = {"_id": 0, "supabase_uid": 1, **{f: 1 for f in lookup.fields}}
+        docs = await db.user_profiles.find({"supabase_uid": {"$in": uids}}, projection).to_list(len(uids))
+        by_uid = {doc["supabase_uid"]: doc for doc in docs}
+        return FastJSONResponse(content={"profiles": [by_uid.get(uid) for uid in lookup.uids]})
+    
+    bodies = {uid: cached.body for uid, cached in (await profile_cache.get_many(uids)).items()}
+    
+    missing = [uid for uid in uids if uid not in bodies]
+    if missing:
+        generation = profile_cache.generation()
+        async for doc in db.user_profiles.find({"supabase_uid": {"$in": missing}}):
+            bodies[doc["supabase_uid"]] = (await cache_profile(doc, generation)).body
+    
+    # Splice the already-serialized profiles together instead of re-encoding
+    body = '{"profiles":[' + ",".join(bodies.get(uid, "null") for uid in lookup.uids) + ']}'
+    return Response(content=body, media_type="application/json")
+
+# Change notifications
+@api_router.get("/events")
+async def get_events(
+    request: Request,
+    last_event_id: Optional[str] = None,
+    user: dict = Depends(get_stream_user)
+):
+    """
+    Server-sent events for the caller's profile and VR session changes.
+
+    Events are notifications (profile.updated, session.created) - clients
+    refetch the resource. Reconnects resume from Last-Event-ID; a "reset"
+    event means events were missed and state should be refetched in full.
+    """
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    try:
+        event_hub.check_capacity(user["sub"])
+    except SubscriberLimit as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User profile not found"
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": "5"},
         )
     
-    updated_profile = await db.user_profiles.find_one({"supabase_uid": user["sub"]})
-    return UserProfile(**updated_profile)
+    # The response subscribes when it starts, so nothing leaks if it never does
+    return EventStreamResponse(
+        event_hub,
+        user["sub"],
+        EVENTS_HEARTBEAT,
+        last_event_id=last_event_id,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Keyset pagination cursors: opaque (datetime, id) pairs
+def encode_cursor(timestamp: datetime, item_id: str) -> str:
+    raw = f"{timestamp.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), item_id
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+# VR Session routes
+@api_router.post("/vr/sessions", response_model=VRSession)
+async def create_vr_session(
+    session_data: VRSessionCreate,
+    user: dict = Depends(get_current_user)
+):
+    """Record a VR therapy session for the current user"""
+    session = VRSession(user_id=user["sub"], **session_data.dict(exclude_none=True))
+    await db.vr_sessions.insert_one(session.dict())
+    event_hub.notify(user["sub"], "session.created", {"session_id": session.id})
+    return model_response(session)
 
-# VR Session routes (example of platform-specific functionality)
 @api_router.get("/vr/sessions")
-async def get_vr_sessions(user: dict = Depends(get_current_user)):
-    """Get VR therapy sessions for the current user"""
-    # This would typically fetch actual VR session data
-    return {
-        "user_id": user["sub"],
-        "sessions": [
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Memory Reconstruction Session #1",
-                "date": datetime.utcnow(),
-                "duration": 30,
-                "type": "therapeutic_memory_replay"
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Cognitive Behavioral Therapy Session",
-                "date": datetime.utcnow(),
-                "duration": 45,
-                "type": "cbt_immersion"
-            }
+async def get_vr_sessions(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Get VR therapy sessions for the current user, newest first.
+
+    Pages are walked with the returned ``next_cursor``; ``fields`` is a
+    comma-separated projection (id and date are always included).
+    """
+    query = {"user_id": user["sub"]}
+    if cursor:
+        date, session_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"date": {"$lt": date}},
+            {"date": date, "id": {"$lt": session_id}},
         ]
-    }
+    
+    projection = {"_id": 0}
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - VR_SESSION_FIELDS
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown session fields: {', '.join(sorted(unknown))}"
+            )
+        projection.update({f: 1 for f in requested | {"id", "date"}})
+    
+    sessions = await db.vr_sessions.find(query, projection) \
+        .sort([("date", -1), ("id", -1)]) \
+        .limit(limit) \
+        .to_list(limit)
+    
+    next_cursor = None
+    headers = {}
+    if len(sessions) == limit:
+        next_cursor = encode_cursor(sessions[-1]["date"], sessions[-1]["id"])
+        headers["X-Next-Cursor"] = next_cursor
+    
+    # Mongo documents go straight to the encoder, no jsonable_encoder pass
+    with span("encode.json"):
+        body = dumps({
+            "user_id": user["sub"],
+            "sessions": sessions,
+            "next_cursor": next_cursor
+        })
+    return conditional_response(request, body, headers=headers)
+
+@api_router.get("/vr/sessions/{session_id}", response_model=VRSession)
+async def get_vr_session(request: Request, session_id: str, user: dict = Depends(get_current_user)):
+    """Get a single VR therapy session owned by the current user"""
+    session = await db.vr_sessions.find_one({"id": session_id, "user_id": user["sub"]})
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="VR session not found"
+        )
+    with span("model.VRSession"):
+        session = VRSession(**session)
+    return conditional_response(request, model_bytes(session))
+
+@api_router.put("/vr/sessions/{session_id}/recording", response_model=VRRecording, status_code=201)
+async def upload_vr_recording(request: Request, session_id: str, user: dict = Depends(get_current_user)):
+    """
+    Store the raw request body as the session's recording, replacing any
+    previous one. The body is streamed into GridFS chunks, never held whole.
+    """
+    session = await db.vr_sessions.find_one({"id": session_id, "user_id": user["sub"]}, {"_id": 1})
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="VR session not found"
+        )
+    
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Recordings are limited to {RECORDING_MAX_BYTES} bytes"
+    )
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > RECORDING_MAX_BYTES:
+        raise too_large
+    
+    content_type = request.headers.get("content-type", "application/octet-stream")
+    try:
+        file_doc = await recording_store.upload(
+            request.stream(), user["sub"], session_id, content_type, RECORDING_MAX_BYTES
+        )
+    except RecordingTooLarge:
+        raise too_large
+    
+    recording = VRRecording(
+        session_id=session_id,
+        length=file_doc["length"],
+        content_type=content_type,
+        uploaded_at=file_doc["uploadDate"],
+        etag=f'"{file_doc["_id"]}"',
+    )
+    return model_response(recording, status_code=status.HTTP_201_CREATED)
+
+@api_router.get("/vr/sessions/{session_id}/recording")
+async def download_vr_recording(request: Request, session_id: str, user: dict = Depends(get_current_user)):
+    """
+    Stream the session's recording, honouring Range / If-Range (single
+    byte ranges) and If-None-Match.
+    """
+    file_doc = await recording_store.latest(user["sub"], session_id)
+    if not file_doc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recording not found"
+        )
+    
+    # Recordings are immutable per upload, so the file id is a strong validator
+    length = file_doc["length"]
+    etag = f'"{file_doc["_id"]}"'
+    media_type = file_doc["metadata"].get("content_type", "application/octet-stream")
+    headers = {"Accept-Ranges": "bytes", "ETag": etag}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range.strip() != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, length)
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{length}"},
+        )
+    
+    if length == 0:
+        return Response(content=b"", headers=headers, media_type=media_type)
+    
+    start, end = byte_range or (0, length - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    status_code = status.HTTP_200_OK
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+    return StreamingResponse(
+        recording_store.iter_range(file_doc, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
+
+# In-session telemetry
+@api_router.websocket("/vr/sessions/{session_id}/telemetry")
+async def ingest_vr_telemetry(websocket: WebSocket, session_id: str, access_token: Optional[str] = None):
+    """
+    Stream session telemetry as batched msgpack (binary) or NDJSON (text)
+    frames; the sample format is described in telemetry.py.
+
+    The token (Authorization header, or ?access_token= for browsers) is
+    verified once on connect; expiry and revocation are re-checked every
+    TELEMETRY_AUTH_RECHECK seconds. Each frame is answered with an "ack".
+    "slow_down" asks the client to send less until "resume"; while the
+    session's buffer is full the server stops reading from the socket.
+    """
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not credentials:
+        credentials = access_token
+    try:
+        user = await get_current_user(
+            HTTPAuthorizationCredentials(scheme="Bearer", credentials=credentials) if credentials else None
+        )
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+    
+    if not await db.vr_sessions.find_one({"id": session_id, "user_id": user["sub"]}, {"_id": 1}):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="VR session not found")
+        return
+    try:
+        channel = telemetry_ingest.open(user["sub"], session_id)
+    except TelemetryLimit as e:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(e))
+        return
+    
+    try:
+        await websocket.accept()
+        recheck_at = time.monotonic() + TELEMETRY_AUTH_RECHECK
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            
+            if time.monotonic() >= recheck_at:
+                if (user["exp"] and user["exp"] <= time.time()) or revocations.is_revoked(user):
+                    await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token expired or revoked")
+                    return
+                recheck_at = time.monotonic() + TELEMETRY_AUTH_RECHECK
+            
+            data = message.get("bytes")
+            try:
+                seq, samples = decode_frame(data if data is not None else message.get("text") or "")
+                accepted = channel.add(samples)
+            except FrameError as e:
+                telemetry_ingest.invalid_frames += 1
+                await websocket.send_text(dumps({"type": "error", "reason": str(e)}).decode())
+                continue
+            await websocket.send_text(dumps(channel.ack(seq, accepted)).decode())
+            
+            if channel.congested and not channel.throttled:
+                channel.throttled = True
+                telemetry_ingest.throttles += 1
+                await websocket.send_text(dumps({
+                    "type": "slow_down",
+                    "buffered": channel.buffered,
+                    "max_buffered": telemetry_ingest.max_buffer,
+                }).decode())
+            elif channel.throttled and channel.drained:
+                channel.throttled = False
+                await websocket.send_text(dumps({"type": "resume", "buffered": channel.buffered}).decode())
+            
+            # Not reading the next frame pushes back on the client over TCP
+            if not await channel.wait_for_space(TELEMETRY_STALL_TIMEOUT):
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Telemetry writes are falling behind")
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await channel.close()
 
 # Legacy routes (keeping them for backward compatibility)
 @api_router.get("/")
 async def root():
     return {"message": "CORE - Conscious Observation Reconstruction Engine API"}
 
-@api_router.post("/status", response_model=StatusCheck)
+@api_router.post("/status", response_model=StatusCheck, dependencies=[Depends(ip_rate_limited("status"))])
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
-    return status_obj
+    if STATUS_BUFFER_ENABLED:
+        try:
+            await status_buffer.enqueue(status_obj.dict())
+        except StatusBufferFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Status check ingestion is saturated, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        return model_response(status_obj)
+    status_doc = status_obj.dict()
+    _ = await db.status_checks.insert_one(status_doc)
+    # The check is stored; a failed rollup must not turn into a 500 and a retry
+    try:
+        await rollups.record(db.status_rollups, [status_doc])
+    except Exception as e:
+        logger.error("Status rollup update failed: %s", e)
+    return model_response(status_obj)
+
+@api_router.get("/status/buffer", dependencies=[Depends(require_role(OPS_ROLES))])
+async def get_status_buffer_stats():
+    """Queue depth and flush latency of the status check write-behind buffer"""
+    return {"enabled": STATUS_BUFFER_ENABLED, **status_buffer.stats()}
+
+@api_router.get("/status/rollups", response_model=List[StatusRollup])
+async def get_status_rollups(
+    interval: str = Query("minute", pattern="^(minute|hour|day)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+    source: str = Query("rollup", pattern="^(rollup|raw)$"),
+):
+    """
+    Status check counts per client per interval bucket (default: last 24h).
+
+    Served from the incrementally maintained status_rollups buckets;
+    ``source=raw`` recomputes the same counts from raw status_checks.
+    """
+    until = until or datetime.utcnow()
+    since = since or until - timedelta(days=1)
+    
+    if source == "raw":
+        pipeline = rollups.raw_pipeline(interval, since, until, client_name)
+        buckets = await db.status_checks.aggregate(pipeline).to_list(None)
+    else:
+        query = rollups.bucket_query(interval, since, until, client_name)
+        buckets = await db.status_rollups \
+            .find(query, {"_id": 0, "bucket": 1, "client_name": 1, "count": 1}) \
+            .sort([("bucket", 1), ("client_name", 1)]) \
+            .to_list(None)
+    
+    return model_response([StatusRollup(**bucket) for bucket in buckets], List[StatusRollup])
+
+def status_checks_query(cursor: Optional[str], since: Optional[datetime]) -> dict:
+    """Keyset filter on (timestamp, id), matching the status_checks index"""
+    clauses = []
+    if since is not None:
+        clauses.append({"timestamp": {"$gte": since}})
+    if cursor:
+        timestamp, check_id = decode_cursor(cursor)
+        clauses.append({"$or": [
+            {"timestamp": {"$gt": timestamp}},
+            {"timestamp": timestamp, "id": {"$gt": check_id}},
+        ]})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+async def stream_status_checks(cursor):
+    async for status_check in cursor:
+        yield StatusCheck(**status_check).json() + "\n"
+
+@api_router.get("/status", response_model=List[StatusCheck], dependencies=[Depends(ip_rate_limited("status"))])
+async def get_status_checks(
+    request: Request,
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    stream: bool = False,
+):
+    """
+    List status checks oldest first, one page at a time.
+
+    The next page's cursor is returned in the X-Next-Cursor header. With
+    ?stream=true (or Accept: application/x-ndjson) every matching check is
+    streamed as NDJSON straight from the Mongo cursor, ignoring ``limit``.
+    """
+    query = status_checks_query(cursor, since)
+    sort = [("timestamp", 1), ("id", 1)]
+    
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        mongo_cursor = db.status_checks.find(query, {"_id": 0}).sort(sort).batch_size(500)
+        return StreamingResponse(
+            stream_status_checks(mongo_cursor),
+            media_type="application/x-ndjson"
+        )
+    
+    status_checks = await db.status_checks.find(query, {"_id": 0}).sort(sort).limit(limit).to_list(limit)
+    headers = {}
+    if len(status_checks) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(status_checks[-1]["timestamp"], status_checks[-1]["id"])
+    with span("model.StatusCheck", count=len(status_checks)):
+        models = [StatusCheck(**status_check) for status_check in status_checks]
+    return model_response(models, List[StatusCheck], headers=headers)
+
+@api_router.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+    after: Optional[str] = None,
+    batch_size: int = Query(5000, ge=100, le=50000),
+    user: dict = Depends(require_role(EXPORT_ROLES))
+):
+    """
+    Stream a whole collection (profiles or status_checks) for analytics.
+
+    Filters and the ``fields`` projection run in Mongo; rows are encoded a
+    batch at a time in _id order and include _id, so an interrupted download
+    resumes with ``after=<last _id received>``.
+    """
+    spec = DATASETS.get(dataset)
+    if spec is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown dataset: {dataset}"
+        )
+    try:
+        query = build_query(
+            spec,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+            since=since,
+            until=until,
+            after=after,
+            match={"client_name": client_name} if client_name else None,
+        )
+        encoder = make_encoder(format, query.columns, spec)
+    except ExportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    async def body():
+        async for data, _, _ in export_batches(db[spec.collection], query, encoder, batch_size):
+            yield data
+    
+    return StreamingResponse(
+        body(),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
+
+@api_router.get("/cache/stats", dependencies=[Depends(require_role(OPS_ROLES))])
+async def get_cache_stats():
+    """Hit-rate statistics for the in-process caches"""
+    return {
+        "token_cache": token_cache.stats(),
+        "profile_cache": profile_cache.stats(),
+    }
+
+@api_router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_role(OPS_ROLES))])
+async def get_metrics():
+    """
+    Prometheus text exposition of request, auth, Mongo and cache metrics.
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+    Requires a token with one of OPS_ROLES; configure the scraper with it as
+    a bearer token.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+registry.add_collector(stats_collector("core_token_cache", token_cache.stats))
+registry.add_collector(stats_collector("core_revocations", revocations.stats))
+if jwks_store:
+    registry.add_collector(stats_collector("core_jwks", jwks_store.stats))
+registry.add_collector(stats_collector("core_profile_cache", profile_cache.stats))
+registry.add_collector(stats_collector("core_status_buffer", status_buffer.stats))
+registry.add_collector(stats_collector("core_profile_singleflight", profile_reads.stats))
+for scope, limiter in rate_limiters.items():
+    registry.add_collector(stats_collector(f"core_rate_limit_{scope}", limiter.stats))
+
+# Health probes
+@api_router.get("/health/live")
+async def liveness():
+    """The process is up and serving requests"""
+    return {"status": "ok"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """Ready only when MongoDB answers a ping within HEALTH_CHECK_TIMEOUT"""
+    started = datetime.utcnow()
+    try:
+        await asyncio.wait_for(db.command("ping"), HEALTH_CHECK_TIMEOUT)
+        mongo = {"status": "ok"}
+    except Exception as e:
+        mongo = {"status": "unavailable", "error": str(e) or type(e).__name__}
+    mongo["latency_ms"] = (datetime.utcnow() - started).total_seconds() * 1000
+    
+    ready = mongo["status"] == "ok"
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "mongo": mongo,
+        "pool": {**pool_listener.stats(), "max_pool_size": MONGO_POOL_OPTIONS["maxPoolSize"]},
+    }
+    if STATUS_BUFFER_ENABLED:
+        body["status_buffer_running"] = status_buffer.running
+    return FastJSONResponse(
+        content=body,
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+registry.add_collector(stats_collector("core_mongo_pool", pool_listener.stats))
+registry.register(pool_listener.checkout_wait)
+registry.add_collector(stats_collector("core_compression", compression_stats.stats))
+registry.add_collector(stats_collector("core_tracing", tracer.stats))
+registry.add_collector(stats_collector("core_events", event_hub.stats))
+registry.add_collector(stats_collector("core_telemetry", telemetry_ingest.stats))
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Compression sits inside CORS so CORS headers are added to the encoded response
+if COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=COMPRESSION_ENCODINGS,
+        min_size=COMPRESSION_MIN_SIZE,
+        content_types=COMPRESSION_CONTENT_TYPES,
+        stats=compression_stats,
+    )
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -237,6 +1246,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request IDs, root spans and Server-Timing
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+# Outermost so timings include CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -244,11 +1259,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def warm_up_mongo():
+    """Ping MongoDB and pre-open pooled connections before taking traffic"""
+    try:
+        await db.command("ping")
+        # Concurrent pings force the pool to open that many connections
+        await asyncio.gather(*(db.command("ping") for _ in range(MONGO_WARMUP_CONNECTIONS)))
+        logger.info("MongoDB reachable, %d pooled connections open", pool_listener.open)
+    except Exception as e:
+        logger.error("MongoDB warm-up failed: %s", e)
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("CORE API starting up...")
+    if RATE_LIMIT_ENABLED and "status" in rate_limiters and not RATE_LIMIT_TRUST_FORWARDED:
+        logger.warning("Status rate limit is keyed by peer address; behind a proxy set RATE_LIMIT_TRUST_FORWARDED=true")
+    if jwks_store:
+        await jwks_store.start()
+    await warm_up_mongo()
+    await revocations.start()
+    # Before the index bootstrap, which would create a plain collection
+    await ensure_telemetry_collection(db, TELEMETRY_RETENTION_DAYS * 86400)
+    # "warn" logs missing/drifted indexes, "fail" aborts startup, "off" skips
+    await ensure_indexes(db, mode=os.environ.get('INDEX_BOOTSTRAP_MODE', 'warn'))
+    if STATUS_BUFFER_ENABLED:
+        status_buffer.start()
+    if span_exporter:
+        span_exporter.start()
+    if change_feed:
+        await change_feed.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     logger.info("CORE API shutting down...")
+    # Flush buffered status checks before the connection goes away
+    await status_buffer.stop()
+    if jwks_store:
+        await jwks_store.stop()
+    await revocations.stop()
+    await recording_store.stop()
+    if change_feed:
+        await change_feed.stop()
+    if span_exporter:
+        await span_exporter.stop()
     client.close()
\ No newline at end of file
@@ -0,0 +1,48 @@
+from typing import Awaitable, Callable, List, Optional
+
+from write_behind import WriteBehindBuffer
+
+
+class StatusBufferFull(Exception):
+    pass
+
+
+class StatusBuffer(WriteBehindBuffer):
+    """
+    Write-behind buffer for status check documents.
+
+    Documents are queued in-process and written with insert_many(ordered=False)
+    once ``batch_size`` are pending or ``flush_interval`` seconds have passed.
+    When ``max_queue`` documents are waiting, enqueue() blocks for up to
+    ``put_timeout`` seconds and then raises StatusBufferFull. ``after_flush``
+    is awaited with the documents that were actually inserted.
+    """
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 500,
+        flush_interval: float = 0.25,
+        max_queue: int = 10000,
+        put_timeout: float = 1.0,
+        after_flush: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+    ):
+        super().__init__(
+            collection,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            max_queue=max_queue,
+            after_flush=after_flush,
+            label="Status check",
+        )
+        self.put_timeout = put_timeout
+        self.rejected = 0
+
+    async def enqueue(self, document: dict) -> None:
+        if not await self.wait_for_space(self.put_timeout):
+            self.rejected += 1
+            raise StatusBufferFull("status check buffer is full")
+        self.extend([document])
+
+    def stats(self) -> dict:
+        return {**super().stats(), "rejected": self.rejected}
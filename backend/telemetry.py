@@ -0,0 +1,298 @@
+"""
+In-session telemetry ingestion (head pose, heart rate, markers, ...).
+
+Clients stream batched frames over a WebSocket. A sample is ``[t, kind, value]``
+(or ``{"t": .., "k": .., "v": ..}``) with ``t`` in epoch milliseconds; a
+missing ``t`` means "now". Frames are either
+
+* binary: msgpack of a sample list, or ``{"seq": n, "samples": [...]}``
+* text: NDJSON, one sample per line
+
+Samples land in the ``telemetry`` time-series collection as
+``{"ts", "meta": {"user_id", "session_id", "kind"}, "v"}``.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, List, Optional, Tuple, Union
+
+from pymongo import ASCENDING
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from indexes import IndexSpec, register_index
+from responses import loads
+from write_behind import WriteBehindBuffer
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed for binary frames
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "telemetry"
+
+# Per-session reads; time-series collections only take secondary indexes on
+# meta fields and the time field
+register_index(IndexSpec(COLLECTION, (("meta.session_id", ASCENDING), ("ts", ASCENDING)), "session_ts"))
+
+
+class FrameError(ValueError):
+    pass
+
+
+class TelemetryLimit(Exception):
+    pass
+
+
+async def ensure_collection(db, expire_after_seconds: int = 0) -> bool:
+    """
+    Create the time-series collection if it does not exist yet.
+
+    Must run before ensure_indexes(), which would otherwise create a plain
+    collection. Returns False when the server cannot create time-series
+    collections (MongoDB < 5.0); inserts then go to a regular collection.
+    """
+    options = {"timeseries": {"timeField": "ts", "metaField": "meta", "granularity": "seconds"}}
+    if expire_after_seconds:
+        options["expireAfterSeconds"] = expire_after_seconds
+    try:
+        if COLLECTION in await db.list_collection_names(filter={"name": COLLECTION}):
+            return True
+        await db.create_collection(COLLECTION, **options)
+    except CollectionInvalid:
+        # Another worker created it first
+        pass
+    except PyMongoError as e:
+        logger.warning("Could not create time-series collection %s: %s", COLLECTION, e)
+        return False
+    return True
+
+
+def decode_frame(data: Union[bytes, str]) -> Tuple[Optional[int], List[Any]]:
+    """Split a frame into (client seq or None, raw samples)"""
+    if isinstance(data, str):
+        try:
+            return None, [loads(line) for line in data.splitlines() if line.strip()]
+        except ValueError as e:
+            raise FrameError(f"Invalid NDJSON: {e}")
+
+    if msgpack is None:
+        raise FrameError("Binary frames are not supported by this server, send NDJSON")
+    try:
+        payload = msgpack.unpackb(data, raw=False)
+    except Exception as e:
+        raise FrameError(f"Invalid msgpack: {str(e) or type(e).__name__}")
+    if isinstance(payload, dict):
+        seq, samples = payload.get("seq"), payload.get("samples", [])
+        if not isinstance(samples, list):
+            raise FrameError("Frame samples must be a list")
+        return seq if isinstance(seq, int) else None, samples
+    if isinstance(payload, list):
+        return None, payload
+    raise FrameError("Frame must be a sample list or {seq, samples}")
+
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+MAX_VALUE_DEPTH = 16
+
+
+def check_value(value: Any, depth: int = 0) -> None:
+    """Reject sample values BSON cannot store (or JSON could not have sent)"""
+    if depth > MAX_VALUE_DEPTH:
+        raise FrameError("Sample value is nested too deeply")
+    if value is None or isinstance(value, (bool, float, str)):
+        return
+    if isinstance(value, int):
+        if not INT64_MIN <= value <= INT64_MAX:
+            raise FrameError("Sample integers must fit in 64 bits")
+        return
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            check_value(item, depth + 1)
+        return
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str) or "\0" in key:
+                raise FrameError("Sample object keys must be strings without NUL")
+            check_value(item, depth + 1)
+        return
+    raise FrameError(f"Unsupported sample value type: {type(value).__name__}")
+
+
+def _timestamp(t: Any, now: datetime) -> datetime:
+    if t is None:
+        return now
+    if isinstance(t, bool) or not isinstance(t, (int, float)):
+        raise FrameError("Sample time must be epoch milliseconds")
+    try:
+        return datetime.utcfromtimestamp(t / 1000)
+    except (OverflowError, OSError, ValueError):
+        raise FrameError("Sample time out of range")
+
+
+class TelemetryChannel(WriteBehindBuffer):
+    """
+    Write-behind buffer for one WebSocket's samples, bounded at the ingest's
+    ``max_buffer``. Callers stop reading from the socket while ``full`` (TCP
+    backpressure) and tell the client to slow down while ``congested``.
+    """
+
+    def __init__(self, ingest: "TelemetryIngest", user_id: str, session_id: str):
+        super().__init__(
+            ingest.collection,
+            batch_size=ingest.batch_size,
+            flush_interval=ingest.flush_interval,
+            max_queue=ingest.max_buffer,
+            label="Telemetry",
+        )
+        self.ingest = ingest
+        self.user_id = user_id
+        self.session_id = session_id
+        self.frames = 0
+        self.throttled = False
+        self.start()
+
+    @property
+    def congested(self) -> bool:
+        return self.buffered >= self.ingest.high_watermark
+
+    @property
+    def drained(self) -> bool:
+        return self.buffered <= self.ingest.low_watermark
+
+    def add(self, samples: List[Any]) -> int:
+        """Validate and buffer a frame's samples; all or nothing"""
+        if len(samples) > self.ingest.max_frame_samples:
+            raise FrameError(f"At most {self.ingest.max_frame_samples} samples per frame")
+        now = datetime.utcnow()
+        documents = []
+        for sample in samples:
+            if isinstance(sample, (list, tuple)) and len(sample) == 3:
+                t, kind, value = sample
+            elif isinstance(sample, dict):
+                t, kind, value = sample.get("t"), sample.get("k"), sample.get("v")
+            else:
+                raise FrameError("Sample must be [t, kind, value] or {t, k, v}")
+            if not isinstance(kind, str) or not kind or len(kind) > 64 or "\0" in kind:
+                raise FrameError("Sample kind must be a non-empty string")
+            check_value(value)
+            documents.append({
+                "ts": _timestamp(t, now),
+                "meta": {"user_id": self.user_id, "session_id": self.session_id, "kind": kind},
+                "v": value,
+            })
+
+        self.extend(documents)
+        self.frames += 1
+        self.ingest.received += len(documents)
+        self.ingest.frames += 1
+        return len(documents)
+
+    async def wait_for_space(self, timeout: float) -> bool:
+        if self.full:
+            self.ingest.stalls += 1
+        return await super().wait_for_space(timeout)
+
+    def flush_done(self, inserted: int, failed: int, elapsed: float) -> None:
+        self.ingest.record_flush(inserted, failed, elapsed)
+
+    async def close(self) -> None:
+        """Stop the flusher and write out everything still buffered"""
+        try:
+            await self.stop()
+        finally:
+            self.ingest.release(self)
+
+    def ack(self, seq: Optional[int], accepted: int) -> dict:
+        message = {
+            "type": "ack",
+            "frame": self.frames,
+            "accepted": accepted,
+            "buffered": self.buffered,
+            "written": self.flushed,
+            "dropped": self.failed,
+        }
+        if seq is not None:
+            message["seq"] = seq
+        return message
+
+
+class TelemetryIngest:
+    """
+    Per-worker registry of telemetry channels, their limits and counters.
+
+    Memory is bounded by ``max_connections`` x ``max_buffer`` samples.
+    Clients are told to "slow_down" once a channel holds ``high_watermark``
+    samples and to "resume" when it has drained to ``low_watermark``.
+    """
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 1000,
+        flush_interval: float = 0.5,
+        max_buffer: int = 20000,
+        max_frame_samples: int = 5000,
+        max_connections: int = 500,
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.high_watermark = max_buffer // 2
+        self.low_watermark = max_buffer // 4
+        self.max_frame_samples = max_frame_samples
+        self.max_connections = max_connections
+
+        self._channels = set()
+        self.connections = 0
+        self.rejected = 0
+        self.frames = 0
+        self.invalid_frames = 0
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.stalls = 0
+        self.throttles = 0
+        self.flushes = 0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    def open(self, user_id: str, session_id: str) -> TelemetryChannel:
+        if len(self._channels) >= self.max_connections:
+            self.rejected += 1
+            raise TelemetryLimit("Too many telemetry connections on this worker")
+        channel = TelemetryChannel(self, user_id, session_id)
+        self._channels.add(channel)
+        self.connections += 1
+        return channel
+
+    def release(self, channel: TelemetryChannel) -> None:
+        self._channels.discard(channel)
+
+    def record_flush(self, written: int, dropped: int, elapsed: float) -> None:
+        self.written += written
+        self.dropped += dropped
+        self.flushes += 1
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.total_flush_seconds += elapsed
+
+    def stats(self) -> dict:
+        return {
+            "active_connections": len(self._channels),
+            "max_connections": self.max_connections,
+            "buffered": sum(channel.buffered for channel in self._channels),
+            "connections": self.connections,
+            "rejected": self.rejected,
+            "frames": self.frames,
+            "invalid_frames": self.invalid_frames,
+            "received": self.received,
+            "written": self.written,
+            "dropped": self.dropped,
+            "stalls": self.stalls,
+            "throttles": self.throttles,
+            "flushes": self.flushes,
+            "max_flush_seconds": self.max_flush_seconds,
+            "avg_flush_seconds": (self.total_flush_seconds / self.flushes) if self.flushes else 0.0,
+        }
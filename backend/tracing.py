@@ -0,0 +1,397 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds and status codes
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("core_current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("core_request_id", default=None)
+
+
+class Trace:
+    __slots__ = ("trace_id", "sampled", "spans")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "status", "message")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], kind: int = KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.status = STATUS_UNSET
+        self.message = ""
+        # list.append is atomic, so Mongo listener threads may add spans too
+        trace.spans.append(self)
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        self.end_ns = end_ns or time.time_ns()
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.message = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else 0.0
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Time a block as a child of the current span; a no-op outside a recorded trace"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(e)
+        raise
+    finally:
+        child.end()
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """Decorator recording every call of an async function as a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header, or None"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def server_timing(trace: Trace, root: Span) -> str:
+    """
+    Server-Timing header summing span time per stage (auth, mongo, model, encode).
+
+    The stage is the span name's first dotted segment; spans nested inside a
+    span of the same stage are not counted twice.
+    """
+    stages: Dict[str, float] = {}
+    stage_of = {root.span_id: None}
+    for s in list(trace.spans):
+        if s is root:
+            continue
+        stage = s.name.split(".", 1)[0]
+        stage_of[s.span_id] = stage
+        if stage_of.get(s.parent_id) == stage or not s.end_ns:
+            continue
+        stages[stage] = stages.get(stage, 0.0) + s.duration_ms
+    total = (time.time_ns() - root.start_ns) / 1e6
+    parts = [f"{stage};dur={ms:.2f}" for stage, ms in stages.items()]
+    parts.append(f"total;dur={total:.2f}")
+    return ", ".join(parts)
+
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def otlp_json(trace: Trace, service_name: str) -> dict:
+    """A trace as an OTLP/JSON ExportTraceServiceRequest"""
+    spans = []
+    for s in trace.spans:
+        if not s.end_ns:
+            continue
+        item = {
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": s.kind,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [_attribute(k, v) for k, v in s.attributes.items() if v is not None],
+            "status": {"code": s.status, "message": s.message} if s.message else {"code": s.status},
+        }
+        if s.parent_id:
+            item["parentSpanId"] = s.parent_id
+        spans.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "core.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class FileSpanExporter:
+    """
+    Appends finished traces to ``path`` as OTLP/JSON lines.
+
+    Traces are queued in memory and written from a background task every
+    ``flush_interval`` seconds (file I/O runs in a thread). Once
+    ``max_pending`` traces are waiting, new ones are dropped and counted.
+    The file can be replayed into a collector with the otlpjsonfile receiver.
+    """
+
+    def __init__(self, path: str, service_name: str = "core-api", flush_interval: float = 1.0, max_pending: int = 10000):
+        self.path = path
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[Trace] = []
+        self._task: Optional[asyncio.Task] = None
+
+        self.exported = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def export(self, trace: Trace) -> None:
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(trace)
+
+    def _write(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        traces, self._pending = self._pending, []
+        lines = [json.dumps(otlp_json(t, self.service_name), separators=(",", ":")) + "\n" for t in traces]
+        try:
+            await asyncio.to_thread(self._write, lines)
+            self.exported += len(traces)
+        except OSError as e:
+            self.failures += 1
+            self.dropped += len(traces)
+            logger.error("Writing %d traces to %s failed: %s", len(traces), self.path, e)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+class Tracer:
+    """
+    Decides which requests are traced and hands finished traces to the exporter.
+
+    A request is sampled with probability ``sample_rate`` unless an incoming
+    traceparent header already carries the decision. With ``server_timing``
+    every request records spans so the header can be filled in, but only
+    sampled traces are exported.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, exporter: Optional[FileSpanExporter] = None, server_timing: bool = False):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.server_timing = server_timing
+        self.started = 0
+        self.sampled = 0
+
+    def start_trace(self, traceparent: Optional[str]):
+        """Return (trace, remote parent span id), or (None, None) when not recording"""
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        sampled = sampled and self.exporter is not None
+        if not sampled and not self.server_timing:
+            return None, None
+        self.started += 1
+        return Trace(trace_id, sampled), parent_id
+
+    def finish(self, trace: Trace) -> None:
+        if trace.sampled:
+            self.sampled += 1
+            self.exporter.export(trace)
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "recorded": self.started,
+            "sampled": self.sampled,
+            **(self.exporter.stats() if self.exporter else {}),
+        }
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware assigning request IDs and opening the root span.
+
+    Every response carries X-Request-ID (the client's value if it sent one).
+    Recorded requests get a server span named after the route template, and a
+    Server-Timing header when the tracer has it enabled.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+            elif key == b"traceparent":
+                traceparent = value.decode("latin-1")
+        request_id = request_id or uuid.uuid4().hex
+        id_token = _request_id.set(request_id)
+
+        trace, remote_parent = self.tracer.start_trace(traceparent)
+        root = span_token = None
+        if trace is not None:
+            root = Span(trace, "HTTP " + scope.get("method", ""), remote_parent, KIND_SERVER, {
+                "http.request.method": scope.get("method", ""),
+                "url.path": scope.get("path", ""),
+                "core.request_id": request_id,
+            })
+            span_token = _current_span.set(root)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                if root is not None:
+                    root.attributes["http.response.status_code"] = message["status"]
+                    if message["status"] >= 500:
+                        root.status = STATUS_ERROR
+                    if self.tracer.server_timing:
+                        headers.append((b"server-timing", server_timing(trace, root).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            if root is not None:
+                root.set_error(e)
+            raise
+        finally:
+            _request_id.reset(id_token)
+            if root is not None:
+                _current_span.reset(span_token)
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{scope.get('method', '')} {route}"
+                    root.attributes["http.route"] = route
+                root.end()
+                self.tracer.finish(trace)
+
+
+class MongoSpanListener(monitoring.CommandListener):
+    """
+    Records each Mongo command as a client span of the request that issued it.
+
+    Motor runs commands in worker threads with a copy of the caller's context,
+    so the current span is visible here.
+    """
+
+    def __init__(self):
+        self._pending: Dict[tuple, Span] = {}
+
+    def started(self, event):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        collection = event.command.get(event.command_name)
+        self._pending[(event.connection_id, event.request_id)] = Span(
+            parent.trace, f"mongo.{event.command_name}", parent.span_id, KIND_CLIENT, {
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+                "db.mongodb.collection": collection if isinstance(collection, str) else None,
+            })
+
+    def succeeded(self, event):
+        child = self._pending.pop((event.connection_id, event.request_id), None)
+        if child is not None:
+            child.end(child.start_ns + event.duration_micros * 1000)
+
+    def failed(self, event):
+        child = self._pending.pop((event.connection_id, event.request_id), None)
+        if child is not None:
+            child.status = STATUS_ERROR
+            child.message = str(event.failure.get("errmsg", "")) if isinstance(event.failure, dict) else ""
+            child.end(child.start_ns + event.duration_micros * 1000)
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from bson.errors import InvalidDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    In-process queue of documents written in the background.
+
+    Documents are written with insert_many(ordered=False) once ``batch_size``
+    are pending or ``flush_interval`` seconds have passed, one insert at a
+    time so batches reach Mongo in the order they were queued. The buffer is
+    ``full`` at ``max_queue`` documents; producers wait with
+    wait_for_space(). ``after_flush`` is awaited with the documents that
+    were actually inserted.
+    """
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 500,
+        flush_interval: float = 0.25,
+        max_queue: int = 10000,
+        after_flush: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+        label: str = "Write-behind",
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.after_flush = after_flush
+        self.label = label
+
+        self._buffer: List[dict] = []
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def full(self) -> bool:
+        return len(self._buffer) >= self.max_queue
+
+    def start(self) -> None:
+        if not self.running:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out everything still buffered"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        while self._buffer:
+            await self._flush_once()
+
+    def extend(self, documents: List[dict]) -> None:
+        """Queue documents without waiting; callers check ``full`` first"""
+        self._buffer.extend(documents)
+        self.enqueued += len(documents)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        if self.full:
+            self._space.clear()
+
+    async def wait_for_space(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for the buffer to drop below max_queue"""
+        deadline = time.monotonic() + timeout
+        while self.full:
+            self._space.clear()
+            self._wakeup.set()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._buffer and not self._stopping:
+                await self._flush_once()
+                if len(self._buffer) < self.batch_size:
+                    break
+
+    async def _flush_once(self) -> None:
+        batch = self._buffer[:self.batch_size]
+        del self._buffer[:self.batch_size]
+        if not self.full:
+            self._space.set()
+
+        started = time.perf_counter()
+        inserted = []
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            inserted = batch
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            inserted = [doc for i, doc in enumerate(batch) if i not in failed]
+            logger.error("%s flush partially failed: %s", self.label, e.details.get("writeErrors", [])[:1])
+        except (InvalidDocument, OverflowError) as e:
+            # BSON encoding failed on the client side; find the bad documents
+            # instead of dropping the whole batch with them
+            logger.error("%s batch could not be encoded, inserting one by one: %s", self.label, e)
+            inserted = await self._insert_each(batch)
+        except PyMongoError as e:
+            logger.error("%s flush failed, dropped %d documents: %s", self.label, len(batch), e)
+        except Exception as e:
+            # Anything else must not stop the flusher task
+            logger.exception("%s flush failed, dropped %d documents: %s", self.label, len(batch), e)
+        self.flushed += len(inserted)
+        self.failed += len(batch) - len(inserted)
+
+        if inserted and self.after_flush is not None:
+            try:
+                await self.after_flush(inserted)
+            except Exception as e:
+                logger.error("%s after-flush hook failed: %s", self.label, e)
+
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.total_flush_seconds += elapsed
+        self.flush_done(len(inserted), len(batch) - len(inserted), elapsed)
+
+    async def _insert_each(self, batch: List[dict]) -> List[dict]:
+        inserted = []
+        for doc in batch:
+            try:
+                await self.collection.insert_one(doc)
+            except DuplicateKeyError as e:
+                # Written by the failed insert_many before it stopped
+                if (e.details or {}).get("keyPattern") != {"_id": 1}:
+                    continue
+            except (InvalidDocument, OverflowError, PyMongoError) as e:
+                logger.error("%s document dropped: %s", self.label, e)
+                continue
+            inserted.append(doc)
+        return inserted
+
+    def flush_done(self, inserted: int, failed: int, elapsed: float) -> None:
+        """Hook for subclasses that aggregate flush results elsewhere"""
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": len(self._buffer),
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+            "avg_flush_seconds": (self.total_flush_seconds / self.flushes) if self.flushes else 0.0,
+        }
@@ -253,7 +253,31 @@ class COREBackendTester:
         
         valid_token, user_id, email = self.generate_valid_jwt()
         headers = {"Authorization": f"Bearer {valid_token}"}
-        
+
+        # Test POST VR session
+        try:
+            session_data = {
+                "title": "Memory Reconstruction Session #1",
+                "duration": 30,
+                "type": "therapeutic_memory_replay"
+            }
+
+            response = requests.post(f"{self.backend_url}/vr/sessions",
+                                   headers=headers,
+                                   json=session_data)
+
+            if response.status_code == 200:
+                created_session = response.json()
+                if (created_session.get("user_id") == user_id and
+                    created_session.get("title") == session_data["title"]):
+                    self.log_test("VR Sessions POST", True, "VR session recorded correctly", created_session)
+                else:
+                    self.log_test("VR Sessions POST", False, "VR session data not saved correctly", created_session)
+            else:
+                self.log_test("VR Sessions POST", False, f"VR sessions POST failed with status {response.status_code}", response.text)
+        except Exception as e:
+            self.log_test("VR Sessions POST", False, f"Exception testing VR sessions POST: {str(e)}")
+
         # Test GET VR sessions
         try:
             response = requests.get(f"{self.backend_url}/vr/sessions", headers=headers)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Compression benchmark for CORE API responses
+Measures CPU cost against bytes saved for each available encoding and level,
+and the resulting time-to-deliver over a constrained headset link
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import content_encoding
+from serialization_bench import build_payloads, fast
+
+LEVELS = {"gzip": (1, 5, 9), "br": (1, 4, 6, 11), "zstd": (1, 3, 9)}
+
+
+def compress(name: str, level: int, body: bytes) -> bytes:
+    encoder = content_encoding.ENCODERS[name](level)
+    return encoder.compress(body) + encoder.finish()
+
+
+def run(number: int, mbit: float):
+    bytes_per_second = mbit * 1e6 / 8
+    print(f"encodings: {', '.join(content_encoding.ENCODERS)}  link: {mbit} Mbit/s")
+    print(f"{'route':<22}{'encoding':<10}{'bytes':>9}{'ratio':>8}{'cpu (us)':>10}{'deliver (ms)':>14}")
+    for route, (content, tp) in build_payloads().items():
+        body = fast(content, tp)
+        print(f"{route:<22}{'identity':<10}{len(body):>9}{1.0:>8.2f}{0.0:>10.1f}{len(body) / bytes_per_second * 1e3:>14.2f}")
+        for name in content_encoding.ENCODERS:
+            for level in LEVELS[name]:
+                data = compress(name, level, body)
+                cpu = min(timeit.repeat(lambda: compress(name, level, body), number=number, repeat=3)) / number
+                deliver = cpu + len(data) / bytes_per_second
+                label = f"{name}-{level}"
+                print(f"{'':<22}{label:<10}{len(data):>9}{len(data) / len(body):>8.2f}{cpu * 1e6:>10.1f}{deliver * 1e3:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=50, help="iterations per measurement")
+    parser.add_argument("--mbit", type=float, default=10.0, help="client link speed used for delivery time")
+    args = parser.parse_args()
+    run(args.number, args.mbit)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for the CORE backend API
+Drives the FastAPI app in-process over ASGI with an in-memory Mongo stand-in
+(or a running uvicorn via --url) using concurrent mixed workloads, and reports
+RPS, p50/p95/p99 latency and peak allocations per route
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+import jwt
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "backend"))
+
+from memory_mongo import MemoryDatabase  # noqa: E402
+
+# Absolute numbers only compare on the machine that produced them, so the
+# baseline is generated locally and not committed
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+# (label, weight) – label doubles as the route name in the report
+WORKLOAD = [
+    ("GET /api/auth/me", 20),
+    ("GET /api/profile", 30),
+    ("POST /api/profile", 5),
+    ("PUT /api/profile", 5),
+    ("POST /api/status", 25),
+    ("GET /api/status", 5),
+    ("GET /api/vr/sessions", 10),
+]
+
+
+def generate_valid_jwt(secret, user_id=None, email=None):
+    """Generate a valid Supabase-style JWT, as in backend_test.py"""
+    user_id = user_id or str(uuid.uuid4())
+    email = email or f"{user_id[:8]}@coreplatform.com"
+    payload = {
+        "sub": user_id,
+        "email": email,
+        "role": "authenticated",
+        "aud": "authenticated",
+        "iat": int(time.time()),
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(payload, secret, algorithm="HS256"), user_id
+
+
+def install_memory_db(server):
+    """Point the app at a fresh in-memory database"""
+    memory_db = MemoryDatabase()
+    server.db = memory_db
+    server.status_buffer.collection = memory_db.status_checks
+    server.recording_store.db = memory_db
+    server.revocations.collection = memory_db.token_revocations
+    server.telemetry_ingest.collection = memory_db.telemetry
+    return memory_db
+
+
+async def issue(client, label, headers, seq):
+    method, path = label.split(" ", 1)
+    if label == "POST /api/profile":
+        return await client.post(path, headers=headers, json={
+            "full_name": f"Benchmark User {seq}",
+            "therapy_preferences": ["memory_reconstruction", "anxiety_therapy"],
+            "vr_settings": {"comfort_level": "intermediate", "session_duration": 30},
+        })
+    if label == "PUT /api/profile":
+        return await client.put(path, headers=headers, json={"full_name": f"Benchmark User {seq}"})
+    if label == "POST /api/status":
+        return await client.post(path, json={"client_name": f"headset-{seq % 50}"})
+    if label == "GET /api/status":
+        return await client.get(path, params={"limit": 100})
+    return await client.request(method, path, headers=headers)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def seed(client, tokens):
+    """Give every user a profile and a few sessions so reads hit real data"""
+    for token in tokens:
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.get("/api/profile", headers=headers)
+        for i in range(5):
+            await client.post("/api/vr/sessions", headers=headers, json={
+                "title": f"Memory Reconstruction Session #{i}",
+                "duration": 30,
+                "type": "therapeutic_memory_replay",
+            })
+    for i in range(200):
+        await client.post("/api/status", json={"client_name": f"headset-{i % 50}"})
+
+
+async def run_load(client, tokens, requests_total, concurrency):
+    labels = [label for label, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    counter = iter(range(requests_total))
+    rng = random.Random(42)
+
+    async def worker():
+        for seq in counter:
+            label = rng.choices(labels, weights)[0]
+            headers = {"Authorization": f"Bearer {tokens[seq % len(tokens)]}"}
+            started = time.perf_counter()
+            response = await issue(client, label, headers, seq)
+            latencies[label].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[label] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def measure_allocations(client, tokens, samples):
+    """Peak traced bytes per request for each route, measured sequentially"""
+    results = {}
+    headers = {"Authorization": f"Bearer {tokens[0]}"}
+    tracemalloc.start()
+    try:
+        for label, _ in WORKLOAD:
+            peaks = []
+            for seq in range(samples):
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                await issue(client, label, headers, seq)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - baseline)
+            results[label] = sum(peaks) / len(peaks)
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def summarize(latencies, errors, elapsed, allocations):
+    report = {"total": {}, "routes": {}}
+    total = 0
+    for label, _ in WORKLOAD:
+        values = sorted(latencies.get(label, []))
+        total += len(values)
+        report["routes"][label] = {
+            "requests": len(values),
+            "errors": errors.get(label, 0),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "alloc_kib": allocations.get(label, 0) / 1024,
+        }
+    report["total"] = {"requests": total, "seconds": elapsed, "rps": total / elapsed if elapsed else 0.0}
+    return report
+
+
+def print_report(report):
+    total = report["total"]
+    print(f"\n{total['requests']} requests in {total['seconds']:.2f}s -> {total['rps']:.1f} req/s\n")
+    print(f"{'route':<24}{'n':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'alloc KiB':>11}")
+    for label, row in report["routes"].items():
+        print(f"{label:<24}{row['requests']:>7}{row['errors']:>5}{row['p50_ms']:>9.2f}"
+              f"{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['alloc_kib']:>11.1f}")
+
+
+def compare(report, baseline, tolerance):
+    """Return a list of regressions beyond ``tolerance`` (fractional)"""
+    regressions = []
+    if report["total"]["rps"] < baseline["total"]["rps"] * (1 - tolerance):
+        regressions.append(f"throughput {report['total']['rps']:.1f} < baseline {baseline['total']['rps']:.1f} req/s")
+    for label, row in report["routes"].items():
+        base = baseline["routes"].get(label)
+        if not base:
+            continue
+        for key in ("p95_ms", "alloc_kib"):
+            if base[key] and row[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{label} {key} {row[key]:.2f} > baseline {base[key]:.2f}")
+    return regressions
+
+
+async def main(args):
+    # The app logs at INFO; per-request client logging would swamp the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.url:
+        secret = args.jwt_secret
+        client = httpx.AsyncClient(base_url=args.url, timeout=30)
+    else:
+        # Every simulated client shares one IP in-process; measure the app, not the limiter
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+        import server
+        install_memory_db(server)
+        secret = server.SUPABASE_JWT_SECRET
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench")
+
+    tokens = [generate_valid_jwt(secret)[0] for _ in range(args.users)]
+    async with client:
+        await seed(client, tokens)
+        await run_load(client, tokens, min(200, args.requests), args.concurrency)  # warm-up
+        latencies, errors, elapsed = await run_load(client, tokens, args.requests, args.concurrency)
+        allocations = {} if args.no_alloc else await measure_allocations(client, tokens, args.alloc_samples)
+
+    report = summarize(latencies, errors, elapsed, allocations)
+    print_report(report)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"\nBaseline saved to {args.baseline}")
+    elif args.baseline.exists():
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline on this machine to create one")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server (e.g. http://localhost:8001) instead of in-process")
+    parser.add_argument("--jwt-secret", default=None, help="SUPABASE_JWT_SECRET of the server given by --url")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--alloc-samples", type=int, default=50)
+    parser.add_argument("--no-alloc", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression as a fraction")
+    args = parser.parse_args(argv)
+    if args.url and not args.jwt_secret:
+        parser.error("--jwt-secret is required with --url")
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,357 @@
+"""
+In-memory stand-in for the subset of Motor used by backend/server.py
+Lets the API run fully in-process for benchmarks without a MongoDB server
+"""
+
+import asyncio
+import copy
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+def _get(doc: Any, path: str) -> Any:
+    for part in path.split("."):
+        if isinstance(doc, dict) and part in doc:
+            doc = doc[part]
+        else:
+            return _MISSING
+    return doc
+
+
+def _set(doc: dict, path: str, value: Any) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc: dict, path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _compare(op: str, actual: Any, expected: Any) -> bool:
+    if op == "$exists":
+        return (actual is not _MISSING) == bool(expected)
+    if op == "$in":
+        return actual in expected or (isinstance(actual, list) and any(a in expected for a in actual))
+    if op == "$nin":
+        return not _compare("$in", actual, expected)
+    if op == "$ne":
+        return actual != expected
+    if op == "$eq":
+        if expected is None and actual is _MISSING:
+            return True
+        return actual == expected or (isinstance(actual, list) and expected in actual)
+    if actual is _MISSING or actual is None:
+        return False
+    try:
+        if op == "$gt":
+            return actual > expected
+        if op == "$gte":
+            return actual >= expected
+        if op == "$lt":
+            return actual < expected
+        if op == "$lte":
+            return actual <= expected
+    except TypeError:
+        return False
+    raise NotImplementedError(f"query operator {op} is not supported")
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            actual = _get(doc, key)
+            if not all(_compare(op, actual, value) for op, value in condition.items()):
+                return False
+        elif not _compare("$eq", _get(doc, key), condition):
+            return False
+    return True
+
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        result = {}
+        for path in include:
+            value = _get(doc, path)
+            if value is not _MISSING:
+                _set(result, path, copy.deepcopy(value))
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    result = copy.deepcopy(doc)
+    for path, flag in projection.items():
+        if not flag:
+            _unset(result, path)
+    return result
+
+
+def apply_update(doc: dict, update: dict, inserting: bool = False) -> None:
+    for op, fields in update.items():
+        if op == "$setOnInsert":
+            if not inserting:
+                continue
+            op = "$set"
+        for path, value in fields.items():
+            if op == "$set":
+                _set(doc, path, copy.deepcopy(value))
+            elif op == "$unset":
+                _unset(doc, path)
+            elif op == "$inc":
+                current = _get(doc, path)
+                _set(doc, path, (0 if current is _MISSING else current) + value)
+            elif op in ("$addToSet", "$push"):
+                current = _get(doc, path)
+                items = current if isinstance(current, list) else []
+                values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                for item in values:
+                    if op == "$push" or item not in items:
+                        items.append(copy.deepcopy(item))
+                _set(doc, path, items)
+            elif op == "$pull":
+                current = _get(doc, path)
+                if isinstance(current, list):
+                    _set(doc, path, [item for item in current if item != value])
+            else:
+                raise NotImplementedError(f"update operator {op} is not supported")
+
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", query: dict, projection: Optional[dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[dict]] = None
+
+    def sort(self, key, direction: int = 1) -> "MemoryCursor":
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int) -> "MemoryCursor":
+        return self
+
+    def _evaluate(self) -> List[dict]:
+        docs = [doc for doc in self._collection._docs if matches(doc, self._query)]
+        for field, direction in reversed(self._sort):
+            present = [d for d in docs if _get(d, field) not in (_MISSING, None)]
+            absent = [d for d in docs if _get(d, field) in (_MISSING, None)]
+            present.sort(key=lambda d: _get(d, field), reverse=direction < 0)
+            docs = absent + present if direction > 0 else present + absent
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        results = self._evaluate()
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        self._results = self._evaluate()
+        self._position = 0
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._position >= len(self._results):
+            raise StopAsyncIteration
+        doc = self._results[self._position]
+        self._position += 1
+        if self._position % 100 == 0:
+            await asyncio.sleep(0)
+        return doc
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: List[dict] = []
+        self._indexes: Dict[str, dict] = {"_id_": {"key": [("_id", 1)], "v": 2}}
+
+    def _check_unique(self, doc: dict, ignore: Optional[dict] = None) -> None:
+        for name, info in self._indexes.items():
+            if not info.get("unique"):
+                continue
+            key = tuple(_get(doc, field) for field, _ in info["key"])
+            for other in self._docs:
+                if other is not ignore and other is not doc and tuple(_get(other, f) for f, _ in info["key"]) == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}")
+
+    def _insert(self, document: dict) -> Any:
+        document.setdefault("_id", ObjectId())
+        stored = copy.deepcopy(document)
+        self._check_unique(stored)
+        self._docs.append(stored)
+        return document["_id"]
+
+    async def insert_one(self, document: dict):
+        return _Result(inserted_id=self._insert(document), acknowledged=True)
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True):
+        inserted = []
+        for document in documents:
+            try:
+                inserted.append(self._insert(document))
+            except DuplicateKeyError:
+                if ordered:
+                    raise
+        return _Result(inserted_ids=inserted, acknowledged=True)
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> MemoryCursor:
+        return MemoryCursor(self, filter or {}, projection)
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> Optional[dict]:
+        results = await self.find(filter, projection).limit(1).to_list(1)
+        return results[0] if results else None
+
+    async def count_documents(self, filter: dict) -> int:
+        return sum(1 for doc in self._docs if matches(doc, filter))
+
+    def _upsert_seed(self, filter: dict) -> dict:
+        seed = {}
+        for key, value in filter.items():
+            if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value)):
+                _set(seed, key, copy.deepcopy(value))
+        return seed
+
+    def _update(self, filter: dict, update: dict, upsert: bool) -> Tuple[Optional[dict], Optional[dict], Any]:
+        for doc in self._docs:
+            if matches(doc, filter):
+                before = copy.deepcopy(doc)
+                apply_update(doc, update)
+                self._check_unique(doc)
+                return before, doc, None
+        if not upsert:
+            return None, None, None
+        doc = self._upsert_seed(filter)
+        apply_update(doc, update, inserting=True)
+        upserted_id = self._insert(doc)
+        return None, self._docs[-1], upserted_id
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False):
+        before, after, upserted_id = self._update(filter, update, upsert)
+        return _Result(
+            matched_count=0 if before is None else 1,
+            modified_count=0 if before is None or before == after else 1,
+            upserted_id=upserted_id,
+        )
+
+    async def find_one_and_update(
+        self,
+        filter: dict,
+        update: dict,
+        projection: Optional[dict] = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+    ) -> Optional[dict]:
+        before, after, _ = self._update(filter, update, upsert)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return None if doc is None else project(doc, projection)
+
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        counts = {"inserted_count": 0, "matched_count": 0, "modified_count": 0, "upserted_count": 0}
+        for request in requests:
+            if isinstance(request, InsertOne):
+                self._insert(request._doc)
+                counts["inserted_count"] += 1
+            elif isinstance(request, UpdateOne):
+                before, after, upserted_id = self._update(request._filter, request._doc, request._upsert)
+                if before is not None:
+                    counts["matched_count"] += 1
+                    counts["modified_count"] += int(before != after)
+                elif upserted_id is not None:
+                    counts["upserted_count"] += 1
+            else:
+                raise NotImplementedError(f"bulk operation {type(request).__name__} is not supported")
+        return _Result(acknowledged=True, **counts)
+
+    async def delete_many(self, filter: dict):
+        kept = [doc for doc in self._docs if not matches(doc, filter)]
+        deleted = len(self._docs) - len(kept)
+        self._docs = kept
+        return _Result(deleted_count=deleted)
+
+    async def index_information(self) -> Dict[str, dict]:
+        return copy.deepcopy(self._indexes)
+
+    async def create_indexes(self, models) -> List[str]:
+        names = []
+        for model in models:
+            spec = model.document
+            info = {"key": list(spec["key"].items()), "v": 2}
+            if spec.get("unique"):
+                info["unique"] = True
+            if "expireAfterSeconds" in spec:
+                info["expireAfterSeconds"] = spec["expireAfterSeconds"]
+            self._indexes[spec["name"]] = info
+            names.append(spec["name"])
+        return names
+
+    async def drop(self) -> None:
+        self._docs = []
+
+
+class MemoryDatabase:
+    def __init__(self, name: str = "benchmark"):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(name)
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, command, **kwargs) -> dict:
+        return {"ok": 1.0}
+
+    async def list_collection_names(self, filter: Optional[dict] = None) -> List[str]:
+        names = list(self._collections)
+        if filter and "name" in filter:
+            names = [name for name in names if name == filter["name"]]
+        return names
+
+    async def create_collection(self, name: str, **options) -> MemoryCollection:
+        collection = self[name]
+        collection.options = options
+        return collection
+
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for VR session recording upload and download
+Streams a large recording into PUT /api/vr/sessions/{id}/recording, reads it
+back whole and as random byte ranges, and reports MB/s and range latency.
+Runs in-process against the in-memory Mongo stand-in, or a server via --url
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "backend"))
+
+from load_bench import generate_valid_jwt, install_memory_db, percentile  # noqa: E402
+
+MB = 1024 * 1024
+
+
+async def body(size: int, piece: int):
+    """Yield ``size`` bytes in ``piece``-sized parts without holding the whole file"""
+    block = os.urandom(piece)
+    sent = 0
+    while sent < size:
+        part = block[:min(piece, size - sent)]
+        sent += len(part)
+        yield part
+
+
+async def main(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.url:
+        secret = args.jwt_secret
+        client = httpx.AsyncClient(base_url=args.url, timeout=300)
+    else:
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+        import server
+        install_memory_db(server)
+        # Free each round's recording as soon as it is replaced; nothing else reads it
+        server.recording_store.replace_grace = 0
+        secret = server.SUPABASE_JWT_SECRET
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench", timeout=300)
+
+    token, _ = generate_valid_jwt(secret)
+    headers = {"Authorization": f"Bearer {token}"}
+    size = int(args.size_mb * MB)
+
+    async with client:
+        response = await client.post("/api/vr/sessions", headers=headers, json={
+            "title": "Recording benchmark", "duration": 60, "type": "benchmark",
+        })
+        response.raise_for_status()
+        path = f"/api/vr/sessions/{response.json()['id']}/recording"
+
+        print(f"recording: {args.size_mb:g} MB, request parts of {args.piece_kb} KB")
+        for attempt in range(args.rounds):
+            started = time.perf_counter()
+            response = await client.put(
+                path,
+                headers={**headers, "Content-Type": "video/mp4"},
+                content=body(size, args.piece_kb * 1024),
+            )
+            response.raise_for_status()
+            upload = time.perf_counter() - started
+
+            started = time.perf_counter()
+            received = 0
+            async with client.stream("GET", path, headers=headers) as download:
+                download.raise_for_status()
+                async for part in download.aiter_bytes():
+                    received += len(part)
+            full = time.perf_counter() - started
+            assert received == size, f"downloaded {received} of {size} bytes"
+            print(f"round {attempt + 1}: upload {size / MB / upload:8.1f} MB/s   download {size / MB / full:8.1f} MB/s")
+
+        latencies = []
+        range_bytes = args.range_kb * 1024
+        for _ in range(args.ranges):
+            start = random.randrange(0, max(1, size - range_bytes))
+            started = time.perf_counter()
+            response = await client.get(path, headers={**headers, "Range": f"bytes={start}-{start + range_bytes - 1}"})
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 206 and len(response.content) == min(range_bytes, size - start)
+        latencies.sort()
+        print(f"{args.ranges} x {args.range_kb} KB ranges: p50 {percentile(latencies, 50):.2f} ms  "
+              f"p95 {percentile(latencies, 95):.2f} ms  p99 {percentile(latencies, 99):.2f} ms")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server (e.g. http://localhost:8001) instead of in-process")
+    parser.add_argument("--jwt-secret", default=None, help="SUPABASE_JWT_SECRET of the server given by --url")
+    parser.add_argument("--size-mb", type=float, default=256)
+    parser.add_argument("--piece-kb", type=int, default=64, help="size of each request body part sent")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--ranges", type=int, default=200)
+    parser.add_argument("--range-kb", type=int, default=256)
+    args = parser.parse_args(argv)
+    if args.url and not args.jwt_secret:
+        parser.error("--jwt-secret is required with --url")
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for CORE API responses
+Compares FastAPI's default encoding path (jsonable_encoder + stdlib json)
+against the fast path in backend/responses.py, per route payload
+"""
+
+import sys
+import timeit
+import uuid
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import responses
+from server import StatusCheck, UserProfile, VRSession
+
+
+def build_payloads():
+    """Representative payloads for the serialization-heavy routes"""
+    profile = UserProfile(
+        supabase_uid=str(uuid.uuid4()),
+        email="test.user@coreplatform.com",
+        full_name="Dr. Sarah Chen",
+        therapy_preferences=["memory_reconstruction", "anxiety_therapy", "ptsd_treatment"],
+        vr_settings={
+            "comfort_level": "intermediate",
+            "session_duration": 30,
+            "scenes": [{"id": i, "name": f"scene-{i}", "intensity": i / 10, "tags": ["calm", "forest"]} for i in range(50)],
+        },
+    )
+    status_checks = [StatusCheck(client_name=f"headset-{i % 20}") for i in range(1000)]
+    sessions = [
+        VRSession(user_id="u1", title=f"Session #{i}", duration=30, type="cbt_immersion").dict()
+        for i in range(50)
+    ]
+    me = {"user_id": str(uuid.uuid4()), "email": "test.user@coreplatform.com", "role": "authenticated"}
+    return {
+        "GET /api/profile": (profile, UserProfile),
+        "GET /api/status": (status_checks, List[StatusCheck]),
+        "GET /api/vr/sessions": ({"user_id": "u1", "sessions": sessions, "next_cursor": None}, None),
+        "GET /api/auth/me": (me, None),
+    }
+
+
+def baseline(content):
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def fast(content, tp):
+    if tp is not None:
+        return responses.model_response(content, tp).body
+    return responses.FastJSONResponse(content=content).body
+
+
+def run(number: int = 200):
+    print(f"encoder: {'orjson' if responses.USE_ORJSON else 'stdlib json'}")
+    print(f"{'route':<22}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for route, (content, tp) in build_payloads().items():
+        before = min(timeit.repeat(lambda: baseline(content), number=number, repeat=3)) / number
+        after = min(timeit.repeat(lambda: fast(content, tp), number=number, repeat=3)) / number
+        print(f"{route:<22}{before * 1e6:>14.1f}{after * 1e6:>14.1f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
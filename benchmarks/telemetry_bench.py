@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Sustained ingest benchmark for the VR telemetry WebSocket
+Opens one socket per session, streams pre-encoded frames with a bounded
+number of unacknowledged frames in flight (halved on "slow_down"), and
+reports acknowledged samples/second, ack latency and server-side counters.
+In-process mode serves the app with uvicorn in this process against the
+in-memory Mongo stand-in, so client and server share one CPU: the figure is
+a lower bound for one worker. Use --url against a single-worker server for
+the real per-worker number.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import msgpack
+import websockets
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "backend"))
+
+from load_bench import generate_valid_jwt, install_memory_db, percentile  # noqa: E402
+
+
+class DiscardCollection:
+    """Telemetry sink for in-process runs: counts inserts, optionally slow"""
+
+    def __init__(self, write_ms: float):
+        self.write_ms = write_ms
+        self.documents = 0
+
+    async def insert_many(self, documents, ordered=True):
+        if self.write_ms:
+            await asyncio.sleep(self.write_ms / 1000)
+        self.documents += len(documents)
+
+    async def insert_one(self, document):
+        await self.insert_many([document])
+
+
+def build_frames(fmt: str, samples: int, count: int = 16) -> list:
+    """Frames of head-pose samples at 90 Hz plus a heart-rate sample each"""
+    frames = []
+    t = int(time.time() * 1000)
+    for i in range(count):
+        batch = []
+        for _ in range(samples - 1):
+            t += 11
+            batch.append([t, "pose", [round(random.uniform(-1, 1), 4) for _ in range(7)]])
+        batch.append([t, "hr", random.randint(60, 90)])
+        if fmt == "msgpack":
+            frames.append(msgpack.packb({"seq": i, "samples": batch}))
+        else:
+            frames.append("\n".join(json.dumps(sample) for sample in batch))
+    return frames
+
+
+async def run_session(url: str, frames: list, window: int, deadline: float, warmup_until: float, result: dict):
+    sent_at = []
+    limit = window
+    space = asyncio.Event()
+    space.set()
+    async with websockets.connect(url, max_size=None) as ws:
+        async def receive():
+            nonlocal limit
+            async for message in ws:
+                reply = json.loads(message)
+                if reply["type"] == "ack":
+                    latency = (time.perf_counter() - sent_at.pop(0)) * 1000
+                    if time.perf_counter() >= warmup_until:
+                        result["samples"] += reply["accepted"]
+                        result["latencies"].append(latency)
+                elif reply["type"] == "slow_down":
+                    # Keep half the window in flight until the server says resume
+                    result["slow_downs"] += 1
+                    limit = max(1, window // 2)
+                elif reply["type"] == "resume":
+                    limit = window
+                elif reply["type"] == "error":
+                    raise RuntimeError(reply["reason"])
+                if len(sent_at) < limit:
+                    space.set()
+
+        receiver = asyncio.create_task(receive())
+        i = 0
+        while time.perf_counter() < deadline:
+            await space.wait()
+            sent_at.append(time.perf_counter())
+            await ws.send(frames[i % len(frames)])
+            i += 1
+            if len(sent_at) >= limit:
+                space.clear()
+        # Let outstanding acks arrive, then hang up
+        while sent_at and not receiver.done():
+            await asyncio.sleep(0.01)
+        receiver.cancel()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def main(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    server_task = sink = server = None
+    if args.url:
+        secret, base = args.jwt_secret, args.url.rstrip("/")
+    else:
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+        os.environ.setdefault("EVENTS_SOURCE", "local")
+        import uvicorn
+        import server
+        install_memory_db(server)
+        sink = server.telemetry_ingest.collection = DiscardCollection(args.write_ms)
+        secret = server.SUPABASE_JWT_SECRET
+        port = free_port()
+        uv = uvicorn.Server(uvicorn.Config(server.app, port=port, log_level="warning", ws="websockets"))
+        server_task = asyncio.create_task(uv.serve())
+        while not uv.started:
+            await asyncio.sleep(0.05)
+        base = f"http://127.0.0.1:{port}"
+
+    token, _ = generate_valid_jwt(secret)
+    async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+        session_ids = []
+        for n in range(args.sessions):
+            response = await client.post("/api/vr/sessions", headers={"Authorization": f"Bearer {token}"}, json={
+                "title": f"Telemetry benchmark {n}", "duration": 60, "type": "benchmark",
+            })
+            response.raise_for_status()
+            session_ids.append(response.json()["id"])
+
+    frames = build_frames(args.format, args.frame_samples)
+    ws_base = "ws" + base[len("http"):]
+    result = {"samples": 0, "latencies": [], "slow_downs": 0}
+    started = time.perf_counter()
+    warmup_until = started + args.warmup
+    deadline = warmup_until + args.duration
+    print(f"{args.sessions} sessions, {args.format} frames of {args.frame_samples} samples, "
+          f"window {args.window}, {args.duration:g}s after {args.warmup:g}s warm-up")
+    await asyncio.gather(*(
+        run_session(f"{ws_base}/api/vr/sessions/{sid}/telemetry?access_token={token}",
+                    frames, args.window, deadline, warmup_until, result)
+        for sid in session_ids
+    ))
+
+    latencies = sorted(result["latencies"])
+    print(f"acknowledged: {result['samples'] / args.duration:12,.0f} samples/s")
+    print(f"ack latency:  p50 {percentile(latencies, 50):.2f} ms  p99 {percentile(latencies, 99):.2f} ms")
+    print(f"slow_down signals: {result['slow_downs']}")
+    if server_task is not None:
+        await asyncio.sleep(server.telemetry_ingest.flush_interval * 2)
+        stats = server.telemetry_ingest.stats()
+        print(f"server: received {stats['received']:,}  written {sink.documents:,}  "
+              f"stalls {stats['stalls']}  flushes {stats['flushes']}  invalid frames {stats['invalid_frames']}")
+        uv.should_exit = True
+        await server_task
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server (e.g. http://localhost:8001) instead of in-process")
+    parser.add_argument("--jwt-secret", default=None, help="SUPABASE_JWT_SECRET of the server given by --url")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sockets")
+    parser.add_argument("--format", choices=("msgpack", "ndjson"), default="msgpack")
+    parser.add_argument("--frame-samples", type=int, default=100, help="samples per frame")
+    parser.add_argument("--window", type=int, default=8, help="unacknowledged frames allowed per socket")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--write-ms", type=float, default=0, help="in-process only: simulated insert_many latency")
+    args = parser.parse_args(argv)
+    if args.url and not args.jwt_secret:
+        parser.error("--jwt-secret is required with --url")
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,143 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from content_encoding import CompressionMiddleware, CompressionStats, negotiate
+from responses import encoded_etag, etag_matches, strip_etag_coding
+
+BODY = b'{"items":[' + b",".join(b'{"n":%d}' % i for i in range(500)) + b"]}"
+
+
+def app_sending(*messages):
+    async def app(scope, receive, send):
+        for message in messages:
+            await send(message)
+    return app
+
+
+def start(status=200, content_type=b"application/json", etag=None):
+    headers = [(b"content-type", content_type)]
+    if etag:
+        headers.append((b"etag", etag))
+    return {"type": "http.response.start", "status": status, "headers": headers}
+
+
+def body(data, more_body=False):
+    return {"type": "http.response.body", "body": data, "more_body": more_body}
+
+
+def call(app, accept="gzip", method="GET", headers=(), **options):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "headers": [(b"accept-encoding", accept.encode())] + [(k, v) for k, v in headers],
+    }
+    middleware = CompressionMiddleware(app, encodings=("gzip",), **options)
+    asyncio.run(middleware(scope, None, send))
+    return sent, middleware.stats
+
+
+def response_headers(sent):
+    return dict(sent[0]["headers"])
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("*, br;q=0", "zstd"),
+    ("zstd, gzip", "zstd"),
+])
+def test_negotiate_uses_server_preference(header, expected):
+    assert negotiate(header, ["br", "zstd", "gzip"]) == expected
+
+
+def test_compresses_complete_json_body():
+    sent, stats = call(app_sending(start(), body(BODY)))
+    headers = response_headers(sent)
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(sent[1]["body"])
+    assert gzip.decompress(sent[1]["body"]) == BODY
+    assert stats.compressed == 1
+
+
+def test_small_bodies_and_other_types_are_sent_as_is():
+    sent, stats = call(app_sending(start(), body(b'{"ok":true}')))
+    assert b"content-encoding" not in response_headers(sent)
+    assert sent[1]["body"] == b'{"ok":true}'
+    assert stats.skipped_small == 1
+
+    sent, _ = call(app_sending(start(content_type=b"application/octet-stream"), body(BODY)))
+    assert b"content-encoding" not in response_headers(sent)
+
+
+def test_client_without_accept_encoding_gets_identity():
+    sent, _ = call(app_sending(start(), body(BODY)), accept="identity")
+    assert b"content-encoding" not in response_headers(sent)
+    assert sent[1]["body"] == BODY
+
+
+def test_streaming_chunks_are_flushed_individually():
+    lines = [b'{"line":%d}\n' % i for i in range(3)]
+    app = app_sending(
+        start(content_type=b"application/x-ndjson"),
+        *(body(line, more_body=True) for line in lines),
+        body(b""),
+    )
+    sent, stats = call(app)
+    assert stats.streamed == 1
+    assert b"content-length" not in response_headers(sent)
+    decoder = zlib.decompressobj(31)
+    # Each chunk decodes to its line on arrival, without waiting for the end
+    for line, message in zip(lines, sent[1:]):
+        assert message["more_body"]
+        assert decoder.decompress(message["body"]) == line
+    assert not sent[-1]["more_body"]
+    decoder.decompress(sent[-1]["body"])
+    assert decoder.eof
+
+
+@pytest.mark.parametrize("status", [206, 304])
+def test_partial_and_not_modified_pass_through(status):
+    sent, _ = call(app_sending(start(status=status), body(BODY if status == 206 else b"")))
+    assert b"content-encoding" not in response_headers(sent)
+    assert sent[0]["status"] == status
+
+
+def test_strong_etag_gets_coding_suffix():
+    sent, _ = call(app_sending(start(etag=b'"abc"'), body(BODY)))
+    assert response_headers(sent)[b"etag"] == b'"abc-gzip"'
+
+    sent, _ = call(app_sending(start(etag=b'W/"abc"'), body(BODY)))
+    assert response_headers(sent)[b"etag"] == b'W/"abc"'
+
+
+def test_not_modified_echoes_the_coded_etag():
+    sent, _ = call(app_sending(start(status=304, etag=b'"abc"'), body(b"")), headers=[(b"if-none-match", b'"abc-gzip"')])
+    assert response_headers(sent)[b"etag"] == b'"abc-gzip"'
+
+    sent, _ = call(app_sending(start(status=304, etag=b'"abc"'), body(b"")), headers=[(b"if-none-match", b'"abc"')])
+    assert response_headers(sent)[b"etag"] == b'"abc"'
+
+
+def test_coded_etags_match_the_resource_etag():
+    assert encoded_etag('"abc"', "br") == '"abc-br"'
+    assert strip_etag_coding('"abc-zstd"') == '"abc"'
+    assert strip_etag_coding('"abc-deflate"') == '"abc-deflate"'
+    # If-Match (strong comparison) still accepts the validator of a compressed GET
+    assert etag_matches('"abc-gzip"', '"abc"', weak=False)
+    assert etag_matches('W/"abc-gzip"', '"abc"')
+    assert not etag_matches('W/"abc-gzip"', '"abc"', weak=False)
+    assert not etag_matches('"abd-gzip"', '"abc"', weak=False)
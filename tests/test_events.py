@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+
+from events import EventHub, EventStreamResponse, SubscriberLimit
+
+SCOPE = {"type": "http", "method": "GET", "path": "/api/events", "headers": []}
+
+
+def test_capacity_limits():
+    hub = EventHub(max_subscribers=3, max_per_user=2)
+    hub.subscribe("a")
+    hub.subscribe("a")
+    with pytest.raises(SubscriberLimit) as exc:
+        hub.check_capacity("a")
+    assert exc.value.status_code == 429
+    hub.subscribe("b")
+    with pytest.raises(SubscriberLimit) as exc:
+        hub.subscribe("c")
+    assert exc.value.status_code == 503
+    assert hub.stats()["rejected"] == 2
+
+
+def test_replay_after_last_event_id():
+    hub = EventHub(queue_size=2)
+    first = hub.dispatch("a", "profile.updated", {})
+    hub.dispatch("b", "profile.updated", {})
+    second = hub.dispatch("a", "session.created", {})
+    subscription = hub.subscribe("a", first.id)
+    assert subscription.queue.get_nowait() is second
+    assert subscription.queue.empty()
+
+
+def test_replay_overflow_sends_reset():
+    hub = EventHub(queue_size=2)
+    first = hub.dispatch("a", "profile.updated", {})
+    for _ in range(3):
+        hub.dispatch("a", "profile.updated", {})
+    subscription = hub.subscribe("a", first.id)
+    assert subscription.queue.get_nowait().type == "reset"
+    assert subscription.queue.empty()
+
+
+def test_response_that_never_runs_holds_no_slot():
+    hub = EventHub(max_per_user=1)
+    EventStreamResponse(hub, "a", heartbeat=10)
+    EventStreamResponse(hub, "a", heartbeat=10)
+    assert hub.stats()["subscribers"] == 0
+    hub.check_capacity("a")
+
+
+def test_slot_is_held_while_streaming_and_released_on_disconnect():
+    async def run():
+        hub = EventHub()
+        sent = []
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message.get("body") == b"retry: 3000\n\n":
+                hub.dispatch("a", "profile.updated", {"n": 1})
+            elif message["type"] == "http.response.body":
+                disconnect.set()
+
+        await EventStreamResponse(hub, "a", heartbeat=10)(SCOPE, receive, send)
+        assert sent[0]["status"] == 200
+        assert b"event: profile.updated" in sent[2]["body"]
+        assert hub.stats()["subscribers"] == 0
+
+    asyncio.run(run())
+
+
+def test_slot_is_released_when_sending_fails():
+    async def run():
+        hub = EventHub()
+
+        async def receive():
+            await asyncio.sleep(10)
+
+        async def send(message):
+            raise OSError("connection reset")
+
+        with pytest.raises(Exception):
+            await EventStreamResponse(hub, "a", heartbeat=10)(SCOPE, receive, send)
+        assert hub.stats()["subscribers"] == 0
+
+    asyncio.run(run())
+
+
+def test_limit_reached_after_the_route_check_returns_an_error():
+    async def run():
+        hub = EventHub(max_per_user=1)
+        response = EventStreamResponse(hub, "a", heartbeat=10)
+        hub.subscribe("a")
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await response(SCOPE, None, send)
+        assert sent[0]["status"] == 429
+        assert (b"retry-after", b"5") in sent[0]["headers"]
+        assert json.loads(sent[1]["body"]) == {"detail": "Too many event streams for this user"}
+        assert hub.stats()["subscribers"] == 1
+
+    asyncio.run(run())
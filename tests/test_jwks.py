@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk
+
+import jwks
+from jwks import JWKSKeyStore
+
+
+def make_jwk(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return {**jwk.construct(pem, algorithm="RS256").to_dict(), "kid": kid, "use": "sig"}
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return {kid: make_jwk(kid) for kid in ("old", "new")}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(jwks.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def publish(tmp_path):
+    path = tmp_path / "jwks.json"
+
+    def write(*key_data):
+        path.write_text(json.dumps({"keys": list(key_data)}))
+        return str(path)
+
+    return write
+
+
+def test_known_kid_with_matching_algorithm(keys, publish, clock):
+    async def run():
+        store = JWKSKeyStore(publish(keys["old"]))
+        await store.refresh()
+        assert await store.get_key("old", "RS256") is not None
+        assert await store.get_key("old", "ES256") is None
+        assert await store.get_key("old", "RS512") is None
+        assert await store.get_key(None, "RS256") is None
+
+    asyncio.run(run())
+
+
+def test_rotated_key_is_found_once_refresh_is_allowed(keys, publish, clock):
+    async def run():
+        source = publish(keys["old"])
+        store = JWKSKeyStore(source, min_refresh_interval=30, negative_ttl=300)
+        await store.refresh()
+
+        # Seen while refreshes are rate limited: no fetch, not locked out for negative_ttl
+        assert await store.get_key("new", "RS256") is None
+        assert store.fetches == 1
+
+        publish(keys["old"], keys["new"])
+        clock[0] += 31
+        assert await store.get_key("new", "RS256") is not None
+        assert store.fetches == 2
+
+    asyncio.run(run())
+
+
+def test_kid_missing_after_refresh_is_negatively_cached(keys, publish, clock):
+    async def run():
+        store = JWKSKeyStore(publish(keys["old"]), min_refresh_interval=30, negative_ttl=300)
+        await store.refresh()
+        clock[0] += 31
+        assert await store.get_key("bogus", "RS256") is None
+        assert store.fetches == 2
+
+        clock[0] += 31
+        assert await store.get_key("bogus", "RS256") is None
+        assert store.fetches == 2
+        assert store.negative_hits == 1
+
+        clock[0] += 300
+        assert await store.get_key("bogus", "RS256") is None
+        assert store.fetches == 3
+
+    asyncio.run(run())
+
+
+def test_unknown_kids_refresh_at_most_once_per_interval(keys, publish, clock):
+    async def run():
+        store = JWKSKeyStore(publish(keys["old"]), min_refresh_interval=30)
+        await store.refresh()
+        clock[0] += 31
+        results = await asyncio.gather(*(store.get_key(f"bogus-{i}", "RS256") for i in range(50)))
+        assert results == [None] * 50
+        assert store.fetches == 2
+
+        for i in range(50, 100):
+            assert await store.get_key(f"bogus-{i}", "RS256") is None
+        assert store.fetches == 2
+
+    asyncio.run(run())
+
+
+def test_failed_fetch_does_not_negatively_cache_for_the_full_ttl(keys, publish, tmp_path, clock):
+    async def run():
+        source = publish(keys["old"])
+        store = JWKSKeyStore(source, min_refresh_interval=30, negative_ttl=300)
+        await store.refresh()
+        (tmp_path / "jwks.json").write_text("not json")
+        clock[0] += 31
+        assert await store.get_key("new", "RS256") is None
+        assert store.fetch_failures == 1
+
+        publish(keys["old"], keys["new"])
+        clock[0] += 31
+        assert await store.get_key("new", "RS256") is not None
+
+    asyncio.run(run())
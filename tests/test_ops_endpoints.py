@@ -0,0 +1,23 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from jose import jwt
+
+
+def token(role):
+    return jwt.encode({"sub": "ops-test", "role": role, "aud": "authenticated"}, server.SUPABASE_JWT_SECRET, algorithm="HS256")
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(server.app)
+
+
+@pytest.mark.parametrize("path", ["/api/metrics", "/api/cache/stats", "/api/status/buffer"])
+def test_operational_endpoints_require_an_ops_role(client, path):
+    assert client.get(path).status_code in (401, 403)
+    response = client.get(path, headers={"Authorization": f"Bearer {token('authenticated')}"})
+    assert response.status_code == 403
+    response = client.get(path, headers={"Authorization": f"Bearer {token('service_role')}"})
+    assert response.status_code == 200
@@ -0,0 +1,49 @@
+import asyncio
+
+from profile_cache import CachedProfile, MemoryBackend, ProfileCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_fill_without_concurrent_write_is_cached():
+    cache = ProfileCache(MemoryBackend())
+    generation = cache.generation()
+    assert run(cache.fill("u1", generation, '"v1"', "{}"))
+    assert run(cache.get("u1")) == CachedProfile('"v1"', "{}")
+
+
+def test_fill_after_a_write_does_not_overwrite_it():
+    cache = ProfileCache(MemoryBackend())
+    generation = cache.generation()
+    # A PUT lands while the GET is still reading the old document
+    run(cache.set("u1", '"v2"', '{"v":2}'))
+    assert not run(cache.fill("u1", generation, '"v1"', '{"v":1}'))
+    assert run(cache.get("u1")) == CachedProfile('"v2"', '{"v":2}')
+    assert cache.stats()["stale_fills"] == 1
+
+
+def test_fill_after_an_invalidation_is_skipped():
+    cache = ProfileCache(MemoryBackend())
+    generation = cache.generation()
+    run(cache.invalidate("u1"))
+    assert not run(cache.fill("u1", generation, '"v1"', "{}"))
+    assert run(cache.get("u1")) is None
+
+
+def test_writes_to_other_profiles_do_not_block_fills():
+    cache = ProfileCache(MemoryBackend())
+    generation = cache.generation()
+    run(cache.set("u2", '"x"', "{}"))
+    assert run(cache.fill("u1", generation, '"v1"', "{}"))
+
+
+def test_forgotten_writes_make_older_fills_stale():
+    cache = ProfileCache(MemoryBackend(), max_tracked_writes=2)
+    generation = cache.generation()
+    for uid in ("u1", "u2", "u3"):
+        run(cache.set(uid, '"x"', "{}"))
+    # u1's write is no longer tracked, so the fill cannot be proven fresh
+    assert not run(cache.fill("u1", generation, '"old"', "{}"))
+    assert run(cache.fill("u1", cache.generation(), '"new"', "{}"))
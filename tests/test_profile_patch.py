@@ -0,0 +1,86 @@
+import pytest
+
+from profile_patch import PatchError, compile_merge_patch, compile_operations
+
+
+def test_merge_patch_sets_top_level_fields():
+    assert compile_merge_patch({"full_name": "Ada"}) == {"$set": {"full_name": "Ada"}}
+
+
+def test_merge_patch_merges_nested_objects_key_by_key():
+    update = compile_merge_patch({"vr_settings": {"comfort_level": "high", "haptics": {"enabled": True}}})
+    assert update == {"$set": {"vr_settings.comfort_level": "high", "vr_settings.haptics.enabled": True}}
+
+
+def test_merge_patch_nested_null_unsets():
+    update = compile_merge_patch({"vr_settings": {"comfort_level": None}})
+    assert update == {"$unset": {"vr_settings.comfort_level": ""}}
+
+
+def test_merge_patch_top_level_null_resets_to_default():
+    update = compile_merge_patch({"full_name": None, "therapy_preferences": None, "vr_settings": None})
+    assert update == {"$set": {"full_name": None, "therapy_preferences": [], "vr_settings": {}}}
+
+
+def test_merge_patch_replaces_arrays():
+    update = compile_merge_patch({"therapy_preferences": ["anxiety_therapy"]})
+    assert update == {"$set": {"therapy_preferences": ["anxiety_therapy"]}}
+
+
+def test_empty_merge_patch_compiles_to_nothing():
+    assert compile_merge_patch({}) == {}
+
+
+@pytest.mark.parametrize("patch", [
+    [],
+    {"email": "x@example.com"},
+    {"$set": {"full_name": "x"}},
+    {"full_name": 5},
+    {"therapy_preferences": "anxiety_therapy"},
+    {"vr_settings": {"$where": 1}},
+    {"vr_settings": {"a.b": 1}},
+])
+def test_merge_patch_rejects_invalid_patches(patch):
+    with pytest.raises(PatchError):
+        compile_merge_patch(patch)
+
+
+def test_operations_compile_to_operators():
+    update = compile_operations(
+        set_paths={"vr_settings.comfort_level": "high"},
+        unset_paths=["vr_settings.haptics"],
+        add_to_set={"therapy_preferences": ["memory_reconstruction"]},
+    )
+    assert update == {
+        "$set": {"vr_settings.comfort_level": "high"},
+        "$unset": {"vr_settings.haptics": ""},
+        "$addToSet": {"therapy_preferences": {"$each": ["memory_reconstruction"]}},
+    }
+
+
+def test_operations_unset_top_level_resets_to_default():
+    update = compile_operations(unset_paths=["full_name", "vr_settings"])
+    assert update == {"$set": {"full_name": None, "vr_settings": {}}}
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"set_paths": {"vr_settings": {}, "vr_settings.comfort_level": "high"}},
+    {"set_paths": {"vr_settings.comfort_level": "high"}, "unset_paths": ["vr_settings.comfort_level"]},
+    {"set_paths": {"therapy_preferences": []}, "add_to_set": {"therapy_preferences": ["x"]}},
+    {"set_paths": {"vr_settings.a": 1}, "unset_paths": ["vr_settings.a.b"]},
+])
+def test_operations_reject_conflicting_paths(kwargs):
+    with pytest.raises(PatchError, match="Conflicting paths|more than once"):
+        compile_operations(**kwargs)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"set_paths": {"email": "x"}},
+    {"set_paths": {"full_name.first": "x"}},
+    {"add_to_set": {"full_name": ["x"]}},
+    {"add_to_set": {"therapy_preferences": "x"}},
+    {"add_to_set": {"therapy_preferences": [1]}},
+])
+def test_operations_reject_invalid_paths_and_values(kwargs):
+    with pytest.raises(PatchError):
+        compile_operations(**kwargs)
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import rate_limit
+from rate_limit import SingleFlight, TokenBucketLimiter, parse_limit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_parse_limit():
+    assert parse_limit("10:30") == (10.0, 30.0)
+    assert parse_limit("5") == (5.0, 5.0)
+
+
+def test_burst_then_limited(clock):
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+    assert [limiter.acquire("a")[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = limiter.acquire("a")
+    assert not allowed and retry_after == pytest.approx(0.5)
+    # Buckets are per key
+    assert limiter.acquire("b") == (True, 0.0)
+    assert limiter.stats()["limited"] == 2
+
+
+def test_refill_is_capped_at_burst(clock):
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+    for _ in range(3):
+        limiter.acquire("a")
+    clock[0] += 0.5
+    assert limiter.acquire("a")[0]
+    assert not limiter.acquire("a")[0]
+
+    clock[0] += 60
+    assert [limiter.acquire("a")[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_idle_buckets_are_evicted_lru_first(clock):
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("a")
+    limiter.acquire("c")
+    assert limiter.stats()["tracked_keys"] == 2
+    # "b" was dropped and starts again with a full bucket
+    assert limiter.acquire("b")[0]
+
+
+def test_limited_request_gets_429_with_retry_after(monkeypatch, clock):
+    import server
+
+    monkeypatch.setitem(server.rate_limiters, "test", TokenBucketLimiter(rate=0.25, burst=1))
+    server.enforce_rate_limit("test", "a")
+    with pytest.raises(HTTPException) as exc:
+        server.enforce_rate_limit("test", "a")
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "4"
+
+
+def test_single_flight_shares_one_execution():
+    async def run():
+        flights = SingleFlight()
+        calls = []
+        release = asyncio.Event()
+
+        async def load():
+            calls.append(1)
+            await release.wait()
+            return "value"
+
+        waiters = [asyncio.ensure_future(flights.do("key", load)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*waiters) == ["value"] * 5
+        assert len(calls) == 1
+        assert flights.stats() == {"in_flight": 0, "executed": 1, "shared": 4}
+
+        # Finished calls are not reused
+        assert await flights.do("key", load) == "value"
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+
+def test_single_flight_survives_a_cancelled_caller():
+    async def run():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "value"
+
+        first = asyncio.ensure_future(flights.do("key", load))
+        second = asyncio.ensure_future(flights.do("key", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        assert await second == "value"
+
+    asyncio.run(run())
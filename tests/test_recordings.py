@@ -0,0 +1,109 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from memory_mongo import MemoryDatabase
+from recordings import RangeNotSatisfiable, RecordingStore, parse_range
+
+
+@pytest.mark.parametrize("header", [None, "", "items=0-10", "bytes=0-1,5-9", "bytes=a-b", "bytes=5-x"])
+def test_whole_file_when_range_is_absent_or_unsupported(header):
+    assert parse_range(header, 100) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=0-", "bytes=-5", "bytes=0-10"])
+def test_empty_file_is_always_sent_whole(header):
+    assert parse_range(header, 0) is None
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-200", (90, 99)),
+    ("bytes=99-99", (99, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("Bytes = 5-6", (5, 6)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header, length", [
+    ("bytes=100-", 100),
+    ("bytes=150-200", 100),
+    ("bytes=10-5", 100),
+    ("bytes=-0", 100),
+])
+def test_unsatisfiable_ranges(header, length):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, length)
+
+
+async def chunks_of(*parts):
+    for part in parts:
+        yield part
+
+
+def upload(store, data):
+    return store.upload(chunks_of(data), "user-1", "session-1", "application/octet-stream", 1024)
+
+
+async def read(store, file_doc):
+    return b"".join([part async for part in store.iter_range(file_doc, 0, file_doc["length"] - 1)])
+
+
+def test_upload_splits_into_chunks_and_reads_ranges():
+    async def run():
+        store = RecordingStore(MemoryDatabase(), chunk_size=4, batch_chunks=2, replace_grace=0)
+        file_doc = await upload(store, b"0123456789")
+        assert await store.chunks.count_documents({"files_id": file_doc["_id"]}) == 3
+        assert await read(store, file_doc) == b"0123456789"
+        assert b"".join([p async for p in store.iter_range(file_doc, 3, 8)]) == b"345678"
+
+    asyncio.run(run())
+
+
+def test_replacement_without_grace_deletes_the_old_file():
+    async def run():
+        store = RecordingStore(MemoryDatabase(), chunk_size=4, replace_grace=0)
+        old = await upload(store, b"old recording")
+        new = await upload(store, b"new recording")
+        assert (await store.latest("user-1", "session-1"))["_id"] == new["_id"]
+        assert await store.files.count_documents({}) == 1
+        assert await store.chunks.count_documents({"files_id": old["_id"]}) == 0
+
+    asyncio.run(run())
+
+
+def test_replaced_file_stays_readable_during_the_grace_period():
+    async def run():
+        store = RecordingStore(MemoryDatabase(), chunk_size=4, replace_grace=60)
+        old = await upload(store, b"old recording")
+        new = await upload(store, b"new recording")
+        assert (await store.latest("user-1", "session-1"))["_id"] == new["_id"]
+        # A download that started on the old file can still finish
+        assert await read(store, old) == b"old recording"
+        assert await store.purge_superseded("user-1", "session-1") == 0
+
+        # Once the replacement is older than the grace period, the old file goes
+        for doc in store.files._docs:
+            doc["uploadDate"] -= timedelta(seconds=61)
+        assert await store.purge_superseded("user-1", "session-1") == 1
+        assert await store.chunks.count_documents({"files_id": old["_id"]}) == 0
+        assert await read(store, new) == b"new recording"
+        await store.stop()
+
+    asyncio.run(run())
+
+
+def test_aborted_upload_leaves_no_chunks():
+    async def run():
+        store = RecordingStore(MemoryDatabase(), chunk_size=4, replace_grace=0)
+        with pytest.raises(Exception):
+            await store.upload(chunks_of(b"x" * 600, b"y" * 600), "user-1", "session-1", "video/mp4", 1000)
+        assert await store.chunks.count_documents({}) == 0
+        assert await store.files.count_documents({}) == 0
+
+    asyncio.run(run())
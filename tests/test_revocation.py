@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timezone
+
+from revocation import RevocationList
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, filter, update, upsert=False):
+        self.docs[filter["_id"]] = update["$set"]
+
+
+def revoke_subject(revocations, sub):
+    asyncio.run(revocations.revoke_subject(sub))
+    cutoff = revocations.collection.docs[f"sub:{sub}"]["revoked_before"]
+    return cutoff.replace(tzinfo=timezone.utc).timestamp()
+
+
+def test_subject_cutoff_is_truncated_to_the_second():
+    revocations = RevocationList(FakeCollection())
+    cutoff = revoke_subject(revocations, "user-1")
+    assert cutoff == int(cutoff)
+    assert cutoff <= datetime.now(timezone.utc).timestamp()
+
+
+def test_token_issued_in_the_revocation_second_stays_valid():
+    revocations = RevocationList(FakeCollection())
+    cutoff = int(revoke_subject(revocations, "user-1"))
+    assert not revocations.is_revoked({"sub": "user-1", "iat": cutoff})
+    assert not revocations.is_revoked({"sub": "user-1", "iat": cutoff + 1})
+
+
+def test_tokens_issued_before_the_revocation_second_are_revoked():
+    revocations = RevocationList(FakeCollection())
+    cutoff = int(revoke_subject(revocations, "user-1"))
+    assert revocations.is_revoked({"sub": "user-1", "iat": cutoff - 1})
+    assert revocations.is_revoked({"sub": "user-1"})
+    assert not revocations.is_revoked({"sub": "user-2", "iat": cutoff - 1})
+
+
+def test_revoked_token_id_is_rejected():
+    revocations = RevocationList(FakeCollection())
+    asyncio.run(revocations.revoke_token("jti-1", "user-1"))
+    assert revocations.is_revoked({"sub": "user-1", "jti": "jti-1", "iat": 0})
+    assert not revocations.is_revoked({"sub": "user-1", "jti": "jti-2", "iat": 0})
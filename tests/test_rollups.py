@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import rollups
+from indexes import REQUIRED_INDEXES
+
+
+@pytest.mark.parametrize("timestamp, interval, expected", [
+    (datetime(2024, 3, 1, 12, 34, 56, 789), "minute", datetime(2024, 3, 1, 12, 34)),
+    (datetime(2024, 3, 1, 12, 34, 56), "hour", datetime(2024, 3, 1, 12)),
+    (datetime(2024, 3, 1, 12, 34, 56), "day", datetime(2024, 3, 1)),
+    (datetime(2024, 3, 1, 1, 30, tzinfo=timezone(timedelta(hours=2))), "hour", datetime(2024, 2, 29, 23)),
+    (datetime(2024, 3, 1, 1, 30, tzinfo=timezone(timedelta(hours=2))), "day", datetime(2024, 2, 29)),
+    (datetime(2024, 3, 1, 23, 59, tzinfo=timezone(timedelta(hours=-5))), "day", datetime(2024, 3, 2)),
+    (datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc), "minute", datetime(2024, 3, 1, 12, 0)),
+])
+def test_truncate_returns_naive_utc_bucket_start(timestamp, interval, expected):
+    bucket = rollups.truncate(timestamp, interval)
+    assert bucket == expected
+    assert bucket.tzinfo is None
+
+
+def test_truncate_rejects_unknown_interval():
+    with pytest.raises(ValueError):
+        rollups.truncate(datetime(2024, 1, 1), "week")
+
+
+def test_updates_are_collapsed_and_expire_per_interval():
+    checks = [{"timestamp": datetime(2024, 3, 1, 12, 0, s), "client_name": "a"} for s in range(5)]
+    updates = {op._filter["interval"]: op._doc for op in rollups.rollup_updates(checks)}
+    assert set(updates) == set(rollups.INTERVALS)
+    assert updates["minute"]["$inc"] == {"count": 5}
+    for interval, doc in updates.items():
+        bucket = rollups.truncate(checks[0]["timestamp"], interval)
+        assert doc["$setOnInsert"]["expires_at"] == bucket + timedelta(days=rollups.RETENTION_DAYS[interval])
+
+
+def test_rollups_have_a_ttl_index():
+    specs = [spec for spec in REQUIRED_INDEXES if spec.collection == rollups.COLLECTION and spec.expire_after_seconds is not None]
+    assert [spec.keys for spec in specs] == [(("expires_at", 1),)]
+
+
+class FakeStatusChecks:
+    def __init__(self, rows):
+        self.rows = rows
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+
+        async def rows():
+            for row in self.rows:
+                yield row
+        return rows()
+
+
+class FakeRollups:
+    def __init__(self):
+        self.requests = []
+
+    async def bulk_write(self, requests, ordered=True):
+        self.requests.extend(requests)
+
+
+def test_backfill_overwrites_whole_buckets_only():
+    bucket = datetime(2024, 3, 1, 12)
+    status_checks = FakeStatusChecks([{"bucket": bucket, "client_name": "a", "count": 7}])
+    target = FakeRollups()
+    until = datetime(2024, 3, 1, 12, 30, 15)
+    written = asyncio.run(rollups.backfill(status_checks, target, datetime(2024, 3, 1), until, ["minute", "hour"]))
+
+    assert written == {"minute": 1, "hour": 1}
+    ends = [pipeline[0]["$match"]["timestamp"]["$lt"] for pipeline in status_checks.pipelines]
+    assert ends == [datetime(2024, 3, 1, 12, 30), datetime(2024, 3, 1, 12)]
+    assert target.requests[0]._doc["$set"]["count"] == 7
+    assert target.requests[0]._upsert
@@ -0,0 +1,159 @@
+import asyncio
+
+import bson
+import msgpack
+import pytest
+
+from telemetry import FrameError, TelemetryIngest, decode_frame
+
+
+def test_ndjson_frame():
+    assert decode_frame('[1,"hr",72]\n\n{"k":"marker","v":"start"}\n') == (None, [[1, "hr", 72], {"k": "marker", "v": "start"}])
+
+
+def test_msgpack_sample_list():
+    assert decode_frame(msgpack.packb([[1, "hr", 72]])) == (None, [[1, "hr", 72]])
+
+
+def test_msgpack_frame_with_seq():
+    assert decode_frame(msgpack.packb({"seq": 7, "samples": [[1, "hr", 72]]})) == (7, [[1, "hr", 72]])
+    assert decode_frame(msgpack.packb({"seq": "7"})) == (None, [])
+
+
+@pytest.mark.parametrize("data", [
+    msgpack.packb({"seq": 1, "samples": 5}),
+    msgpack.packb({"seq": 1, "samples": {"t": 1}}),
+    msgpack.packb({"seq": 1, "samples": None}),
+    msgpack.packb(5),
+    b"\xc1",
+    "not json",
+])
+def test_invalid_frames(data):
+    with pytest.raises(FrameError):
+        decode_frame(data)
+
+
+class FakeCollection:
+    """Encodes documents like the driver would, optionally blocking writes"""
+
+    def __init__(self):
+        self.docs = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def insert_many(self, documents, ordered=True):
+        await self.gate.wait()
+        for doc in documents:
+            bson.encode(doc)
+        self.docs.extend(documents)
+
+    async def insert_one(self, document):
+        await self.gate.wait()
+        bson.encode(document)
+        self.docs.append(document)
+
+
+DEEP = 1
+for _ in range(20):
+    DEEP = [DEEP]
+
+
+def open_channel(collection, **options):
+    ingest = TelemetryIngest(collection, flush_interval=0.01, **options)
+    return ingest, ingest.open("user-1", "session-1")
+
+
+@pytest.mark.parametrize("sample", [
+    [1, "hr", 2 ** 63],
+    [1, "hr", -2 ** 63 - 1],
+    [1, "pose", {"a\0b": 1}],
+    [1, "pose", {1: 2}],
+    [1, "pose", {b"k": 2}],
+    [1, "raw", b"bytes"],
+    [1, "raw", msgpack.ExtType(1, b"x")],
+    [1, "hr", DEEP],
+    [1, "", 72],
+    [1, "h\0r", 72],
+    ["1", "hr", 72],
+    [1, "hr"],
+])
+def test_add_rejects_values_bson_cannot_store(sample):
+    async def run():
+        ingest, channel = open_channel(FakeCollection())
+        try:
+            with pytest.raises(FrameError):
+                channel.add([[2, "hr", 70], sample])
+            assert channel.buffered == 0
+        finally:
+            await channel.close()
+
+    asyncio.run(run())
+
+
+def test_add_accepts_json_values():
+    async def run():
+        collection = FakeCollection()
+        ingest, channel = open_channel(collection)
+        samples = [[1, "hr", 2 ** 63 - 1], {"k": "pose", "v": {"q": [0.1, -1, None, True]}}, [None, "marker", "start"]]
+        assert channel.add(samples) == 3
+        await channel.close()
+        assert len(collection.docs) == 3
+        assert ingest.written == 3
+
+    asyncio.run(run())
+
+
+def test_bad_document_does_not_drop_the_rest_of_the_batch():
+    async def run():
+        collection = FakeCollection()
+        ingest, channel = open_channel(collection)
+        channel.add([[1, "hr", 70], [2, "hr", 71]])
+        # Bypasses add() validation, as a value the checks missed would
+        channel.extend([{"ts": None, "meta": {}, "v": 2 ** 64}])
+        channel.add([[3, "hr", 72]])
+        await channel.close()
+        assert [doc["v"] for doc in collection.docs] == [70, 71, 72]
+        assert (ingest.written, ingest.dropped) == (3, 1)
+
+    asyncio.run(run())
+
+
+def test_backpressure_waits_for_the_flusher():
+    async def run():
+        collection = FakeCollection()
+        collection.gate.clear()
+        ingest, channel = open_channel(collection, max_buffer=4, batch_size=2)
+        channel.add([[i, "hr", 70] for i in range(4)])
+        assert channel.full and channel.congested
+        # The flusher takes one batch off the buffer and blocks on the write
+        assert await channel.wait_for_space(1)
+        assert channel.buffered == 2
+
+        channel.add([[5, "hr", 70], [6, "hr", 70]])
+        assert channel.full
+        assert not await channel.wait_for_space(0.05)
+        assert ingest.stalls == 2
+        collection.gate.set()
+        assert await channel.wait_for_space(1)
+        await channel.close()
+        assert len(collection.docs) == 6
+
+    asyncio.run(run())
+
+
+def test_close_releases_the_channel_even_when_the_flush_fails():
+    async def run():
+        ingest, channel = open_channel(FakeCollection(), max_connections=1)
+        with pytest.raises(Exception):
+            ingest.open("user-2", "session-2")
+
+        async def broken_stop():
+            raise RuntimeError("flusher died")
+
+        channel.stop = broken_stop
+        with pytest.raises(RuntimeError):
+            await channel.close()
+        assert ingest.stats()["active_connections"] == 0
+        ingest.open("user-2", "session-2")
+
+    asyncio.run(run())